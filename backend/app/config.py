@@ -20,6 +20,68 @@ class Settings(BaseSettings):
     # CORS settings - allow React frontend
     CORS_ORIGINS: list = ["http://localhost:5173", "http://localhost:3000"]
     
+    # Order archival - terminal orders older than this move to the archive partitions
+    ORDER_ARCHIVE_AFTER_DAYS: int = 180
+    ORDER_ARCHIVE_BATCH_SIZE: int = 500
+    ORDER_ARCHIVE_INTERVAL_MINUTES: int = 60  # 0 disables the background archiver
+    ORDER_EVENT_RETENTION_DAYS: int = 30  # order feed history kept for catch-up
+    # Feed catch-up re-sends events created this long before the cursor, for transactions that committed late
+    ORDER_FEED_GRACE_SECONDS: int = 30
+    
+    # Stale order expiry - pending orders older than this are cancelled and restocked
+    ORDER_PENDING_EXPIRY_MINUTES: int = 2880
+    ORDER_EXPIRY_BATCH_SIZE: int = 200
+    ORDER_EXPIRY_INTERVAL_MINUTES: int = 5  # 0 disables the expiry job
+    
+    # Inventory ledger reconciliation against per-product snapshots (0 disables)
+    INVENTORY_RECONCILE_INTERVAL_MINUTES: int = 60
+    
+    # Periodic re-derivation of the last few days of sales rollups (0 disables)
+    SALES_ROLLUP_REFRESH_INTERVAL_MINUTES: int = 0
+    SALES_ROLLUP_REFRESH_DAYS: int = 2
+    
+    # Group-commit order ingestion: concurrent create_order calls share one commit
+    ORDER_GROUP_COMMIT_ENABLED: bool = False
+    ORDER_GROUP_COMMIT_MAX_BATCH: int = 32
+    ORDER_GROUP_COMMIT_MAX_WAIT_MS: int = 5
+    # An order not picked up by the batch thread within this is placed in its own transaction
+    ORDER_GROUP_COMMIT_TIMEOUT_MS: int = 2000
+    
+    # Maximum ids + skus accepted by POST /products/batch
+    PRODUCT_BATCH_MAX_SIZE: int = 200
+    
+    # Maximum order ids accepted by POST /orders/bulk-cancel
+    ORDER_BULK_CANCEL_MAX_SIZE: int = 500
+    
+    # Admission control - per-worker caps on in-flight requests (see core/admission.py)
+    # MAX_IN_FLIGHT is capped to the DB pool minus its reserved connections (database.py)
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 20
+    ADMISSION_CATALOG_LIMIT: int = 16
+    ADMISSION_ORDER_WRITE_LIMIT: int = 12
+    ADMISSION_ADMIN_LIMIT: int = 6
+    ADMISSION_QUEUE_TIMEOUT_MS: int = 2000  # queued longer than this -> 503
+    ADMISSION_MAX_QUEUE: int = 200
+    ADMISSION_RETRY_AFTER_SECONDS: int = 2
+    
+    # List endpoint encodings (see core/responses.py)
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024
+    RESPONSE_STREAM_CHUNK_ROWS: int = 500
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_QUALITY: int = 4
+    
+    # In-process caches, kept coherent across workers via Postgres LISTEN/NOTIFY
+    CACHE_INVALIDATION_CHANNEL: str = "wholesalemart_cache"
+    PRODUCT_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_TTL_SECONDS: int = 300
+    DASHBOARD_CACHE_TTL_SECONDS: int = 30
+    # SSE events (catalog and order feeds) reach every worker's subscribers over this channel
+    EVENT_FANOUT_CHANNEL: str = "wholesalemart_events"
+    
+    # Low-stock watchlist
+    LOW_STOCK_DEFAULT_THRESHOLD: int = 10
+    LOW_STOCK_ALERT_PHONE: Optional[str] = None  # WhatsApp number for threshold alerts
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,253 @@
+"""
+Admission control
+ASGI middleware that bounds how many requests are in flight at once, overall
+and per route class, so a slow database backs requests up in a short queue
+instead of in the DB pool and thread pool. That only holds while every admitted
+request can get a pooled connection: the overall cap is clamped to the pool
+capacity minus the connections reserved for background threads (database.py).
+Queued requests are admitted in
+priority order (order writes, then admin, then catalog reads with anonymous
+browsing last) and rejected with 503 + Retry-After once their deadline passes.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+from jose import jwt, JWTError
+from ..config import settings
+from ..database import POOL_CAPACITY, DB_POOL_RESERVED
+from .security import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_TYPE
+
+logger = logging.getLogger(__name__)
+
+CATALOG = "catalog"
+ORDER_WRITE = "order_write"
+ADMIN = "admin"
+OTHER = "other"
+
+# Lower is admitted first
+PRIORITY_ORDER_WRITE = 0
+PRIORITY_ADMIN = 1
+PRIORITY_AUTHENTICATED = 2
+PRIORITY_ANONYMOUS = 3
+
+# Long-lived streams hold a connection, not a worker slot: never counted
+EXEMPT_PATHS = ("/products/catalog/stream", "/orders/feed")
+
+# Reads sent as POST because the id list does not fit a query string
+_CATALOG_POST_PATHS = ("/products/batch",)
+# Dry-run order pricing: writes nothing, so it must not take order-write slots
+_ORDER_READ_POST_PATHS = ("/orders/quote",)
+
+
+def classify(method: str, path: str, authenticated: bool) -> Optional[Tuple[str, int]]:
+    """Route class and priority of a request, or None when it bypasses admission control."""
+    if path.startswith(EXEMPT_PATHS):
+        return None
+    if path.startswith(("/dashboard", "/analytics", "/products/manage")):
+        return ADMIN, PRIORITY_ADMIN
+    if path.startswith("/orders"):
+        if method == "GET" or path.startswith(_ORDER_READ_POST_PATHS):
+            return OTHER, PRIORITY_AUTHENTICATED
+        return ORDER_WRITE, PRIORITY_ORDER_WRITE
+    if path.startswith("/products"):
+        if method == "GET" or path.startswith(_CATALOG_POST_PATHS):
+            return CATALOG, PRIORITY_AUTHENTICATED if authenticated else PRIORITY_ANONYMOUS
+        # Product writes are admin-only
+        return ADMIN, PRIORITY_ADMIN
+    return OTHER, PRIORITY_AUTHENTICATED
+
+
+class _Waiter:
+    __slots__ = ("route_class", "future")
+
+    def __init__(self, route_class: str, future: asyncio.Future):
+        self.route_class = route_class
+        self.future = future
+
+
+class AdmissionController:
+    """
+    Slot accounting for one worker. Runs entirely on the event loop, so no locks:
+    every method is called from the loop thread.
+    """
+
+    def __init__(self, max_in_flight: int, class_limits: Dict[str, int], queue_timeout_ms: int, max_queue: int):
+        self.max_in_flight = max_in_flight
+        self.class_limits = class_limits
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.in_flight_by_class: Dict[str, int] = {}
+        # One FIFO per priority level
+        self._queues: Dict[int, deque] = {}
+        self._queued = 0
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, route_class: str, outcome: str) -> None:
+        counters = self._counters.setdefault(route_class, {"admitted": 0, "queued": 0, "rejected": 0})
+        counters[outcome] += 1
+
+    def _has_room(self, route_class: str) -> bool:
+        if self.in_flight >= self.max_in_flight:
+            return False
+        limit = self.class_limits.get(route_class)
+        return limit is None or self.in_flight_by_class.get(route_class, 0) < limit
+
+    def _take(self, route_class: str) -> None:
+        self.in_flight += 1
+        self.in_flight_by_class[route_class] = self.in_flight_by_class.get(route_class, 0) + 1
+        self._count(route_class, "admitted")
+
+    async def acquire(self, route_class: str, priority: int) -> bool:
+        """Wait for a slot. False means the request must be shed."""
+        # Slots are handed to waiters the moment they free up, so if there is room
+        # now nobody queued could have used it: no overtaking
+        if self._has_room(route_class):
+            self._take(route_class)
+            return True
+        if self._queued >= self.max_queue:
+            self._count(route_class, "rejected")
+            return False
+
+        waiter = _Waiter(route_class, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(priority, deque()).append(waiter)
+        self._queued += 1
+        self._count(route_class, "queued")
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted in the same loop iteration the deadline fired
+                return True
+            waiter.future.cancel()
+            self._count(route_class, "rejected")
+            return False
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a slot handed over meanwhile
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(route_class)
+            waiter.future.cancel()
+            raise
+        finally:
+            if not waiter.future.done() or waiter.future.cancelled():
+                self._discard(priority, waiter)
+
+    def _discard(self, priority: int, waiter: _Waiter) -> None:
+        queue = self._queues.get(priority)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+
+    def release(self, route_class: str) -> None:
+        self.in_flight -= 1
+        self.in_flight_by_class[route_class] -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to the highest-priority waiters whose class has room."""
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            for waiter in list(queue):
+                if self.in_flight >= self.max_in_flight:
+                    return
+                if waiter.future.done() or not self._has_room(waiter.route_class):
+                    continue
+                queue.remove(waiter)
+                self._queued -= 1
+                self._take(waiter.route_class)
+                waiter.future.set_result(True)
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queued": self._queued,
+            "class_limits": self.class_limits,
+            "in_flight_by_class": dict(self.in_flight_by_class),
+            "counters": {route_class: dict(counts) for route_class, counts in self._counters.items()},
+        }
+
+
+def _max_in_flight() -> int:
+    """ADMISSION_MAX_IN_FLIGHT, clamped so admitted requests never wait on the DB pool."""
+    available = max(1, POOL_CAPACITY - DB_POOL_RESERVED)
+    if settings.ADMISSION_MAX_IN_FLIGHT > available:
+        logger.warning(f"ADMISSION_MAX_IN_FLIGHT={settings.ADMISSION_MAX_IN_FLIGHT} exceeds the {available} "
+                       f"pooled connections available to requests; admitting {available}")
+        return available
+    return settings.ADMISSION_MAX_IN_FLIGHT
+
+
+admission = AdmissionController(
+    max_in_flight=_max_in_flight(),
+    class_limits={
+        CATALOG: settings.ADMISSION_CATALOG_LIMIT,
+        ORDER_WRITE: settings.ADMISSION_ORDER_WRITE_LIMIT,
+        ADMIN: settings.ADMISSION_ADMIN_LIMIT,
+    },
+    queue_timeout_ms=settings.ADMISSION_QUEUE_TIMEOUT_MS,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+)
+
+
+def has_valid_access_token(headers) -> bool:
+    """
+    Whether the request carries a login token with a valid signature (no user
+    lookup). Merely sending an Authorization header must not buy priority.
+    """
+    for name, value in headers:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return False
+            try:
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            except JWTError:
+                return False
+            return payload.get("typ") == ACCESS_TOKEN_TYPE
+    return False
+
+
+class AdmissionControlMiddleware:
+    """Pure ASGI middleware: the response, streamed or not, passes through untouched."""
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        decision = classify(scope["method"], scope["path"], has_valid_access_token(scope["headers"]))
+        if decision is None:
+            await self.app(scope, receive, send)
+            return
+
+        route_class, priority = decision
+        started = time.monotonic()
+        if not await self.controller.acquire(route_class, priority):
+            await _reject(send, started)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route_class)
+
+
+async def _reject(send, started: float) -> None:
+    body = b'{"detail":"Server is busy, please retry shortly"}'
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode()),
+            (b"x-queue-wait-ms", str(int((time.monotonic() - started) * 1000)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
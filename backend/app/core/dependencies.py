@@ -1,12 +1,37 @@
 from typing import Optional
+from uuid import UUID
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
+from ..config import settings
 from ..database import get_db
 from ..models.user import User
-from .security import SECRET_KEY, ALGORITHM, oauth2_scheme
+from .security import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_TYPE, oauth2_scheme
 from ..schemas.token import TokenData
+from ..services.cache import get_cache, USERS
+from ..services.statements import get_user
+
+user_cache = get_cache(USERS, settings.USER_CACHE_TTL_SECONDS)
+
+def _load_user(db: Session, user_id) -> Optional[User]:
+    """User by id, served from the user cache when possible (no query on a hit)."""
+    key = str(user_id)
+    cached = user_cache.get(key)
+    if cached is not None:
+        # Attach a session-local copy without re-querying
+        return db.merge(cached, load=False)
+    try:
+        # Token subjects are strings; drivers other than psycopg need a real UUID
+        user_id = UUID(key)
+    except ValueError:
+        return None
+    user = get_user(db, user_id)
+    if user is not None:
+        snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+        make_transient_to_detached(snapshot)
+        user_cache.set(key, snapshot)
+    return user
 
 async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     credentials_exception = HTTPException(
@@ -20,13 +45,14 @@ async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: Se
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         role: str = payload.get("role")
-        if user_id is None:
+        # Only login tokens authenticate (quote tokens and future token kinds do not)
+        if user_id is None or payload.get("typ") != ACCESS_TOKEN_TYPE:
             raise credentials_exception
         token_data = TokenData(id=user_id, role=role)
     except JWTError:
         raise credentials_exception
         
-    user = db.query(User).filter(User.id == token_data.id).first()
+    user = _load_user(db, token_data.id)
     if user is None:
         raise credentials_exception
     return user
@@ -53,8 +79,8 @@ async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
-        if user_id is None:
+        if user_id is None or payload.get("typ") != ACCESS_TOKEN_TYPE:
             return None
-        return db.query(User).filter(User.id == user_id).first()
+        return _load_user(db, user_id)
     except JWTError:
         return None
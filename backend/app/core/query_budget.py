@@ -0,0 +1,86 @@
+"""
+Query-count budgets
+Routes declare how many SQL statements a single request may issue with the
+@query_budget decorator; benchmarks/query_budgets.py replays every budgeted
+route against a seeded database with QueryRecorder attached and fails with
+the offending statements when a route goes over budget or its statement
+count grows with the amount of data (e.g. a lazy load per order). It also
+fails on routes that declare neither a budget nor @no_query_budget.
+"""
+import threading
+from typing import Callable, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudget:
+    def __init__(self, max_statements: int, note: Optional[str] = None):
+        self.max_statements = max_statements
+        self.note = note
+
+
+def query_budget(max_statements: int, note: Optional[str] = None) -> Callable:
+    """
+    Declare the statement budget of a route. Apply below the router decorator:
+
+        @router.get("/")
+        @query_budget(3)
+        def read_things(...): ...
+
+    Budgets count every statement the request sends (auth lookup, writes,
+    savepoints, pg_notify), measured with caches cold.
+    """
+    def decorator(endpoint):
+        endpoint.__query_budget__ = QueryBudget(max_statements, note)
+        return endpoint
+    return decorator
+
+
+def no_query_budget(reason: str) -> Callable:
+    """
+    Exempt a route from the budget check, saying why (e.g. an SSE stream that
+    never completes). Every other route must declare a @query_budget.
+    """
+    def decorator(endpoint):
+        endpoint.__query_budget_exempt__ = reason
+        return endpoint
+    return decorator
+
+
+def get_query_budget(endpoint) -> Optional[QueryBudget]:
+    return getattr(endpoint, "__query_budget__", None)
+
+
+def get_query_budget_exemption(endpoint) -> Optional[str]:
+    return getattr(endpoint, "__query_budget_exempt__", None)
+
+
+class QueryRecorder:
+    """Context manager recording every statement executed on an engine."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.statements: List[str] = []
+        self._lock = threading.Lock()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.statements.append(" ".join(statement.split()))
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+        return False
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def report(self, limit: int = 40) -> str:
+        lines = [f"  {index + 1:>3}. {statement[:200]}" for index, statement in enumerate(self.statements[:limit])]
+        if len(self.statements) > limit:
+            lines.append(f"  ... {len(self.statements) - limit} more")
+        return "\n".join(lines)
@@ -0,0 +1,133 @@
+"""
+Response encodings for the list endpoints
+Large lists are negotiated per request: JSON (orjson) or MessagePack
+(`Accept: application/msgpack`), compressed with brotli or gzip when the client
+accepts it and the body is larger than RESPONSE_COMPRESSION_MIN_BYTES. Rows are
+fetched by the caller before the response starts, so the database is never
+held for as long as a slow client takes to download; only the encoding and
+compression run chunk by chunk while the body streams.
+"""
+import zlib
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional
+from uuid import UUID
+import brotli
+import msgpack
+import orjson
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from ..config import settings
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+_MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+
+
+def _parse_weighted(header: Optional[str]) -> Dict[str, float]:
+    """'gzip;q=0.8, br' -> {'gzip': 0.8, 'br': 1.0}; q=0 entries are dropped."""
+    weights = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            weights[token.strip().lower()] = q
+    return weights
+
+
+def negotiate_media_type(request: Request) -> str:
+    accepted = _parse_weighted(request.headers.get("accept"))
+    msgpack_q = max((accepted.get(media_type, 0) for media_type in _MSGPACK_TYPES), default=0)
+    json_q = max(accepted.get(JSON, 0), accepted.get("application/*", 0), accepted.get("*/*", 0))
+    if msgpack_q > 0 and msgpack_q >= json_q:
+        return MSGPACK
+    return JSON
+
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    accepted = _parse_weighted(request.headers.get("accept-encoding"))
+    candidates = [("br", accepted.get("br", 0)), ("gzip", accepted.get("gzip", 0))]
+    # Ties go to the first candidate: brotli compresses JSON noticeably better
+    encoding, q = max(candidates, key=lambda candidate: candidate[1])
+    return encoding if q > 0 else None
+
+
+def _msgpack_default(value):
+    # Same string forms orjson produces, so both encodings carry identical values
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} as MessagePack")
+
+
+def _encode_rows(rows: List[dict], media_type: str) -> Iterator[bytes]:
+    chunk_rows = settings.RESPONSE_STREAM_CHUNK_ROWS
+    if media_type == MSGPACK:
+        packer = msgpack.Packer(default=_msgpack_default)
+        yield packer.pack_array_header(len(rows))
+        for start in range(0, len(rows), chunk_rows):
+            yield b"".join(packer.pack(row) for row in rows[start:start + chunk_rows])
+        return
+    yield b"["
+    for start in range(0, len(rows), chunk_rows):
+        chunk = b",".join(orjson.dumps(row) for row in rows[start:start + chunk_rows])
+        yield chunk if start == 0 else b"," + chunk
+    yield b"]"
+
+
+def _compress(chunks: Iterator[bytes], encoding: str) -> Iterator[bytes]:
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=settings.RESPONSE_BROTLI_QUALITY)
+        for chunk in chunks:
+            out = compressor.process(chunk)
+            if out:
+                yield out
+        yield compressor.finish()
+        return
+    # wbits=31: gzip container
+    compressor = zlib.compressobj(settings.RESPONSE_GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def negotiated_list_response(request: Request, rows: List[dict]) -> Response:
+    """
+    Encode `rows` (plain dicts shaped like the response schema) as the client
+    prefers. Bodies under the compression threshold are sent as one plain
+    response; larger ones stream, compressed when the client accepts it.
+    """
+    media_type = negotiate_media_type(request)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    chunks = _encode_rows(rows, media_type)
+
+    # Encode just far enough to know whether the body crosses the threshold
+    head, size = [], 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= settings.RESPONSE_COMPRESSION_MIN_BYTES:
+            break
+    else:
+        return Response(b"".join(head), media_type=media_type, headers=headers)
+
+    def body() -> Iterator[bytes]:
+        yield from head
+        yield from chunks
+
+    encoding = negotiate_encoding(request)
+    if encoding is None:
+        return StreamingResponse(body(), media_type=media_type, headers=headers)
+    headers["Content-Encoding"] = encoding
+    return StreamingResponse(_compress(body(), encoding), media_type=media_type, headers=headers)
@@ -9,6 +9,14 @@ import os
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey_change_me_in_production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+QUOTE_TOKEN_EXPIRE_SECONDS = int(os.getenv("QUOTE_TOKEN_EXPIRE_SECONDS", "300"))
+# Quotes are signed with their own key and audience so they can never pass as a login token
+QUOTE_SECRET_KEY = os.getenv("QUOTE_SECRET_KEY", SECRET_KEY + ":quote")
+QUOTE_AUDIENCE = "wholesalemart:quote"
+
+# "typ" claim: every consumer checks it, so one kind of token is never accepted as another
+ACCESS_TOKEN_TYPE = "access"
+QUOTE_TOKEN_TYPE = "quote"
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(
@@ -28,6 +36,14 @@ def create_access_token(subject: Union[str, Any], role: str, expires_delta: Opti
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode = {"sub": str(subject), "role": role, "exp": expire}
+    to_encode = {"sub": str(subject), "role": role, "typ": ACCESS_TOKEN_TYPE, "exp": expire}
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+
+def create_quote_token(subject: Union[str, Any], lines: list, total: float, expires_at: datetime) -> str:
+    """Signed, short-lived snapshot of a cart quote (product id, quantity, unit price per line)."""
+    to_encode = {"sub": str(subject), "typ": QUOTE_TOKEN_TYPE, "aud": QUOTE_AUDIENCE,
+                 "lines": lines, "total": total, "exp": expires_at}
+    return jwt.encode(to_encode, QUOTE_SECRET_KEY, algorithm=ALGORITHM)
+
@@ -6,9 +6,19 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from .config import settings
 from .database import engine, Base
-from .models import user, product, order
-from .routers import auth, products, orders, dashboard
+from .core.admission import AdmissionControlMiddleware
+from .core.query_budget import query_budget
+from .models import user, product, order, archive, inventory, analytics as analytics_models
+from .routers import auth, products, orders, dashboard, analytics
+from .services.order_archive import run_archiver_once
+from .services.order_expiry import run_order_expiry_once
+from .services.sales_rollup import run_rollup_refresh_once
+from .services.inventory_ledger import run_inventory_baseline_once, run_inventory_reconciliation_once
+from .services.stock_watch import run_low_stock_rebuild_once
+from .services.scheduler import scheduler
+from .services.invalidation import listener as cache_invalidation_listener
 import sys
 print(f"DEBUG: Loading auth from {auth.__file__}")
 print(f"DEBUG: sys.path: {sys.path}")
@@ -18,6 +28,10 @@ Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="WholesaleMart API")
 
+# Admission control (added before CORS so 503s still carry CORS headers)
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
 # CORS (Allow Frontend to talk to Backend)
 app.add_middleware(
     CORSMiddleware,
@@ -27,11 +41,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def start_background_jobs():
+    # Before any request records a movement: products that predate the ledger start from their current stock
+    run_inventory_baseline_once()
+    # The watchlist is maintained incrementally: backfill products that went low before it existed
+    run_low_stock_rebuild_once()
+    # A job whose interval setting is 0 is not scheduled
+    scheduler.add_job("order-expiry", run_order_expiry_once, settings.ORDER_EXPIRY_INTERVAL_MINUTES * 60)
+    scheduler.add_job("order-archiver", run_archiver_once, settings.ORDER_ARCHIVE_INTERVAL_MINUTES * 60)
+    scheduler.add_job("inventory-reconciliation", run_inventory_reconciliation_once, settings.INVENTORY_RECONCILE_INTERVAL_MINUTES * 60)
+    scheduler.add_job("sales-rollup-refresh", run_rollup_refresh_once, settings.SALES_ROLLUP_REFRESH_INTERVAL_MINUTES * 60)
+    scheduler.start()
+    cache_invalidation_listener.start()
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+    scheduler.stop()
+
 app.include_router(auth.router)
 app.include_router(products.router)
 app.include_router(orders.router)
 app.include_router(dashboard.router)
+app.include_router(analytics.router)
 
 @app.get("/")
+@query_budget(0)
 def read_root():
     return {"message": "WholesaleMart Backend is Running"}
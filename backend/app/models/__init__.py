@@ -1,3 +1,7 @@
 from .user import User
 from .product import Product
 from .order import Order, OrderItem
+from .archive import ArchivedOrder, ArchivedOrderItem
+from .inventory import CategoryStockThreshold, LowStockEntry, InventoryMovement, InventorySnapshot
+from .analytics import SalesDailyProduct
+from .order_event import OrderEvent
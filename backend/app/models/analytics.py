@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Float, Integer, Date
+from sqlalchemy.dialects.postgresql import UUID
+from ..database import Base
+
+# Daily sales rollups, keyed by the day the order was placed. Cancellations and
+# refunds are attributed to the original order day, so the tables are a pure
+# function of order state and can be rebuilt at any time. Each row keeps the
+# product's category at the time of the sale; category totals are summed from
+# these rows.
+
+class SalesDailyProduct(Base):
+    __tablename__ = "sales_daily_product"
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(UUID(as_uuid=True), primary_key=True, index=True)
+    category = Column(String, nullable=False)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    cancelled_amount = Column(Float, nullable=False, default=0.0)  # full order cancellations (restocked)
+    refunded_amount = Column(Float, nullable=False, default=0.0)   # item-level cancellations (damage)
@@ -0,0 +1,53 @@
+from sqlalchemy import Column, String, Float, Integer, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from ..database import Base
+
+# Cold storage for terminal orders. Both tables are range-partitioned by month on
+# the order's creation time; partitions are created on demand by the archiver.
+
+class ArchivedOrder(Base):
+    __tablename__ = "orders_archive"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    # Partition key must be part of the primary key
+    created_at = Column(DateTime, primary_key=True)
+    readable_id = Column(Integer, nullable=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    total = Column(Float, default=0.0)
+    status = Column(String, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    user = relationship("User")
+    items = relationship(
+        "ArchivedOrderItem",
+        primaryjoin="ArchivedOrder.id == foreign(ArchivedOrderItem.order_id)",
+        viewonly=True,
+    )
+
+    @property
+    def customer_phone(self):
+        return self.user.phone if self.user else None
+
+class ArchivedOrderItem(Base):
+    __tablename__ = "order_items_archive"
+    __table_args__ = {"postgresql_partition_by": "RANGE (order_created_at)"}
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    # Copied from the parent order so items land in the same monthly partition
+    order_created_at = Column(DateTime, primary_key=True)
+    order_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False)
+    quantity = Column(Integer, default=1)
+    price = Column(Float, nullable=False)
+    status = Column(String, nullable=False)
+    cancel_reason = Column(String, nullable=True)
+
+    product = relationship("Product")
+
+    @property
+    def product_name(self):
+        return self.product.name if self.product else "Unknown Product"
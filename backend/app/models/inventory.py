@@ -0,0 +1,58 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from ..database import Base
+
+class CategoryStockThreshold(Base):
+    """Reorder threshold applied to every product in a category without its own override."""
+    __tablename__ = "category_stock_thresholds"
+
+    category = Column(String, primary_key=True)
+    threshold = Column(Integer, nullable=False)
+
+class LowStockEntry(Base):
+    """
+    Incrementally maintained low-stock set: one row per active product whose
+    stock is below its effective reorder threshold.
+    """
+    __tablename__ = "low_stock_watchlist"
+
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    stock = Column(Integer, nullable=False)
+    threshold = Column(Integer, nullable=False)
+    since = Column(DateTime, default=datetime.utcnow, index=True)
+
+class InventoryMovement(Base):
+    """
+    Append-only stock ledger: one row per stock-affecting event, written in the
+    same transaction as the Product.stock change. No FK to products or orders:
+    the history outlives deleted products and archived orders.
+    """
+    __tablename__ = "inventory_movements"
+    __table_args__ = (
+        # Reconciliation replays a product's movements after its snapshot
+        Index("ix_inventory_movements_product_id_id", "product_id", "id"),
+    )
+
+    # Integer variant so SQLite (local tooling) still autoincrements
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    product_id = Column(UUID(as_uuid=True), nullable=False)
+    # reservation, restock, damage_loss, manual_adjustment
+    kind = Column(String, nullable=False)
+    # Signed change applied to Product.stock (0 for damage_loss: the stock left with the order)
+    delta = Column(Integer, nullable=False)
+    # Units involved, for kinds whose delta does not tell (damage_loss)
+    quantity = Column(Integer, nullable=False)
+    order_id = Column(UUID(as_uuid=True), nullable=True)
+    note = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class InventorySnapshot(Base):
+    """Last reconciled stock of a product and the ledger position it corresponds to."""
+    __tablename__ = "inventory_snapshots"
+
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    stock = Column(Integer, nullable=False)
+    # Highest stock-changing movement id included in `stock` (0 before the first movement)
+    movement_id = Column(BigInteger().with_variant(Integer, "sqlite"), nullable=False, default=0)
+    taken_at = Column(DateTime, default=datetime.utcnow)
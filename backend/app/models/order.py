@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Float, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -7,6 +7,10 @@ from ..database import Base
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Serves both active-order listings and the archiver's terminal-order scan
+        Index("ix_orders_status_created_at", "status", "created_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     readable_id = Column(Integer, unique=True, autoincrement=True)
@@ -28,13 +32,16 @@ class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id"), nullable=False)
+    order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id"), nullable=False, index=True)
     product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False)
     quantity = Column(Integer, default=1)
     price = Column(Float, nullable=False)
     
     # Values: active, cancelled, shipped, delivered
     status = Column(String, default="active", server_default="active")
+    # Why a cancelled item was cancelled: "order_cancelled" (restocked) or the damage reason.
+    # Added after launch: existing databases need the ALTER TABLE in README.md
+    cancel_reason = Column(String, nullable=True)
 
     order = relationship("Order", back_populates="items")
     product = relationship("Product")
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Float, Integer, BigInteger, DateTime, JSON
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from ..database import Base
+
+class OrderEvent(Base):
+    """
+    Append-only log of order changes backing the admin live feed and its
+    "changes since cursor" catch-up. No FK to orders: archived orders keep their history.
+    """
+    __tablename__ = "order_events"
+
+    # Integer variant so SQLite (local tooling) still autoincrements
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    order_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    readable_id = Column(Integer, nullable=True)
+    user_id = Column(UUID(as_uuid=True), nullable=True)
+    # created, status_changed, cancelled, items_cancelled
+    event_type = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    total = Column(Float, nullable=True)
+    data = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
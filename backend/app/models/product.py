@@ -15,4 +15,6 @@ class Product(Base):
     stock = Column(Integer, default=0)
     status = Column(String, default="active") # 'active', 'inactive'
     category = Column(String, nullable=True)
+    # Per-product low-stock threshold; falls back to the category, then the global default
+    reorder_threshold = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
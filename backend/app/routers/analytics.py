@@ -0,0 +1,135 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import Optional
+from datetime import date, timedelta
+from ..database import get_db
+from ..models.analytics import SalesDailyProduct
+from ..models.product import Product
+from ..models.user import User
+from ..core.query_budget import query_budget
+from ..core.dependencies import require_admin
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+# All analytics read the pre-aggregated daily rollups (see services/sales_rollup.py),
+# so cost depends on the requested range, never on total order history.
+
+def _resolve_range(start: Optional[date], end: Optional[date]):
+    end = end or date.today()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+    return start, end
+
+def _metrics(model):
+    return (
+        func.sum(model.units).label("units"),
+        func.sum(model.revenue).label("revenue"),
+        func.sum(model.cancelled_amount).label("cancelledAmount"),
+        func.sum(model.refunded_amount).label("refundedAmount"),
+    )
+
+def _metrics_dict(row):
+    return {
+        "units": row.units or 0,
+        "revenue": row.revenue or 0.0,
+        "cancelledAmount": row.cancelledAmount or 0.0,
+        "refundedAmount": row.refundedAmount or 0.0,
+        "netRevenue": (row.revenue or 0.0) - (row.cancelledAmount or 0.0) - (row.refundedAmount or 0.0),
+    }
+
+@router.get("/sales/daily")
+@query_budget(2)
+def get_daily_sales(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    group: str = "day",
+    category: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Revenue by day. `group` selects the breakdown:
+    day (totals per day), category (per day and category) or product (per day and product).
+    Defaults to the last 30 days.
+    """
+    start, end = _resolve_range(start, end)
+
+    if group == "product":
+        query = db.query(SalesDailyProduct.day, SalesDailyProduct.product_id, Product.name, SalesDailyProduct.category,
+                         *_metrics(SalesDailyProduct)) \
+            .outerjoin(Product, Product.id == SalesDailyProduct.product_id) \
+            .filter(SalesDailyProduct.day >= start, SalesDailyProduct.day <= end) \
+            .group_by(SalesDailyProduct.day, SalesDailyProduct.product_id, Product.name, SalesDailyProduct.category) \
+            .order_by(SalesDailyProduct.day)
+        if category:
+            query = query.filter(SalesDailyProduct.category == category)
+        return [
+            {"date": row.day, "productId": str(row.product_id), "name": row.name, "category": row.category, **_metrics_dict(row)}
+            for row in query.all()
+        ]
+
+    if group not in ("day", "category"):
+        raise HTTPException(status_code=400, detail="group must be one of: day, category, product")
+
+    # Summed from the per-product rows, which carry the category at sale time
+    keys = [SalesDailyProduct.day] + ([SalesDailyProduct.category] if group == "category" else [])
+    query = db.query(*keys, *_metrics(SalesDailyProduct)) \
+        .filter(SalesDailyProduct.day >= start, SalesDailyProduct.day <= end) \
+        .group_by(*keys) \
+        .order_by(SalesDailyProduct.day)
+    if category:
+        query = query.filter(SalesDailyProduct.category == category)
+    return [
+        {"date": row.day, **({"category": row.category} if group == "category" else {}), **_metrics_dict(row)}
+        for row in query.all()
+    ]
+
+@router.get("/top-sellers")
+@query_budget(2)
+def get_top_sellers(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    by: str = "revenue",
+    limit: int = 10,
+    category: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Top products over a date range, ranked by net revenue or units sold."""
+    start, end = _resolve_range(start, end)
+    units, revenue, cancelled, refunded = _metrics(SalesDailyProduct)
+    net_revenue = (func.sum(SalesDailyProduct.revenue) - func.sum(SalesDailyProduct.cancelled_amount)
+                   - func.sum(SalesDailyProduct.refunded_amount))
+    if by == "revenue":
+        ranking = net_revenue
+    elif by == "units":
+        ranking = func.sum(SalesDailyProduct.units)
+    else:
+        raise HTTPException(status_code=400, detail="by must be one of: revenue, units")
+
+    ranked = db.query(SalesDailyProduct.product_id, units, revenue, cancelled, refunded) \
+        .filter(SalesDailyProduct.day >= start, SalesDailyProduct.day <= end)
+    if category:
+        ranked = ranked.filter(SalesDailyProduct.category == category)
+    ranked = ranked.group_by(SalesDailyProduct.product_id) \
+        .order_by(ranking.desc()) \
+        .limit(min(max(limit, 1), 100)) \
+        .subquery()
+
+    rows = db.query(ranked, Product.name, Product.sku, Product.category) \
+        .outerjoin(Product, Product.id == ranked.c.product_id) \
+        .all()
+    result = [
+        {
+            "productId": str(row.product_id),
+            "name": row.name,
+            "sku": row.sku,
+            "category": row.category,
+            **_metrics_dict(row),
+        } for row in rows
+    ]
+    # Re-apply the ranking: joining the subquery does not preserve its order
+    result.sort(key=lambda r: r["netRevenue"] if by == "revenue" else r["units"], reverse=True)
+    return result
@@ -3,8 +3,11 @@ from sqlalchemy.orm import Session
 from ..database import get_db
 from ..schemas.user import UserCreate, UserLogin, UserResponse, OTPRequest, OTPVerify
 from ..schemas.token import Token
+from ..core.query_budget import query_budget
 from ..models.user import User as UserModel
 from ..core.security import verify_password, create_access_token, get_password_hash
+from ..services.cache import USERS, DASHBOARD
+from ..services.invalidation import invalidate
 from datetime import timedelta
 
 router = APIRouter(
@@ -13,6 +16,7 @@ router = APIRouter(
 )
 
 @router.post("/login", response_model=Token)
+@query_budget(1)
 async def login_for_access_token(user_in: UserLogin, db: Session = Depends(get_db)):
     user = db.query(UserModel).filter(UserModel.email == user_in.email).first()
     
@@ -31,6 +35,7 @@ async def login_for_access_token(user_in: UserLogin, db: Session = Depends(get_d
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/otp/send")
+@query_budget(0)
 async def send_otp(otp_in: OTPRequest):
     # SIMULATED OTP LOGIC
     print(f"------------ MOCK SMS ----------")
@@ -40,6 +45,7 @@ async def send_otp(otp_in: OTPRequest):
     return {"message": "OTP sent successfully"}
 
 @router.post("/otp/verify", response_model=Token)
+@query_budget(5, note="auto-registration; includes pg_notify cache invalidations")
 async def verify_otp(otp_in: OTPVerify, db: Session = Depends(get_db)):
     # 1. Verify Code (Hardcoded for Simulation)
     if otp_in.otp != "123456":
@@ -56,6 +62,10 @@ async def verify_otp(otp_in: OTPVerify, db: Session = Depends(get_db)):
             role="customer"
         )
         db.add(user)
+        db.flush()
+        invalidate(db, USERS, [user.id])
+        # totalCustomers on the dashboard
+        invalidate(db, DASHBOARD)
         db.commit()
         db.refresh(user)
 
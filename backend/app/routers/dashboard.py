@@ -1,20 +1,46 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from typing import List, Dict, Any
+from uuid import UUID
 from ..database import get_db
 from ..models.order import Order, OrderItem
 from ..models.product import Product
 from ..models.user import User
+from ..models.inventory import CategoryStockThreshold, LowStockEntry
+from ..services.stock_watch import refresh_low_stock
+from ..services.read_models import all_orders
+from ..services.cache import get_cache, cache_stats, DASHBOARD
+from ..services.invalidation import invalidate
+from ..services.scheduler import scheduler
+from ..services.statements import statement_cache_stats
+from ..services.inventory_ledger import reconcile_inventory, load_movements
+from ..config import settings
+from ..core.query_budget import query_budget
+from ..core.admission import admission
 from ..core.dependencies import require_admin
 from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+dashboard_cache = get_cache(DASHBOARD, settings.DASHBOARD_CACHE_TTL_SECONDS)
+
 @router.get("/stats")
+@query_budget(8)
 def get_dashboard_stats(db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    # Invalidated by order / product writes; DASHBOARD_CACHE_TTL_SECONDS bounds any write path that misses it
+    stats = dashboard_cache.get("stats")
+    if stats is None:
+        stats = _compute_dashboard_stats(db)
+        dashboard_cache.set("stats", stats)
+    return stats
+
+def _compute_dashboard_stats(db: Session):
+    # Archived (old delivered / cancelled) orders still count towards revenue
+    orders = all_orders(("total", "status", "created_at"))
+
     # 1. Total Revenue (Excluding cancelled orders)
-    total_revenue = db.query(func.sum(Order.total)).filter(Order.status != "cancelled").scalar() or 0.0
+    total_revenue = db.query(func.sum(orders.c.total)).filter(orders.c.status != "cancelled").scalar() or 0.0
 
     # 2. Pending Orders Count
     pending_orders_count = db.query(func.count(Order.id)).filter(Order.status == "pending").scalar() or 0
@@ -25,21 +51,26 @@ def get_dashboard_stats(db: Session = Depends(get_db), current_user: User = Depe
     # 4. Total Customers
     total_customers = db.query(func.count(User.id)).filter(User.role == "customer").scalar() or 0
 
-    # 5. Low Stock Alert (Stock < 10)
-    low_stock_products = db.query(Product).filter(Product.stock < 10, Product.status == "active").all()
+    # 5. Low Stock Alert (maintained incrementally in the watchlist)
+    low_stock_products = _low_stock_query(db).all()
     low_stock_count = len(low_stock_products)
 
     # 6. Recent Orders (Last 5)
-    recent_orders = db.query(Order).order_by(Order.created_at.desc()).limit(5).all()
+    recent_orders = db.query(Order).options(joinedload(Order.user)).order_by(Order.created_at.desc()).limit(5).all()
     
-    # 7. Revenue Trend (Last 7 days) - Simple calculation
+    # 7. Revenue Trend (Last 7 days) - one grouped query instead of one per day
+    first_day = (datetime.now() - timedelta(days=6)).date()
+    daily_totals = db.query(func.date(orders.c.created_at), func.sum(orders.c.total)).filter(
+        orders.c.created_at >= datetime.combine(first_day, datetime.min.time()),
+        orders.c.status != "cancelled"
+    ).group_by(func.date(orders.c.created_at)).all()
+    # str() normalizes drivers that return the day as a date or as a string
+    revenue_by_day = {str(day): revenue for day, revenue in daily_totals}
+
     revenue_trend = []
     for i in range(6, -1, -1):
         date = (datetime.now() - timedelta(days=i)).date()
-        daily_revenue = db.query(func.sum(Order.total)).filter(
-            func.date(Order.created_at) == date,
-            Order.status != "cancelled"
-        ).scalar() or 0.0
+        daily_revenue = revenue_by_day.get(str(date)) or 0.0
         revenue_trend.append({
             "date": date.strftime("%b %d"),
             "revenue": daily_revenue
@@ -69,7 +100,115 @@ def get_dashboard_stats(db: Session = Depends(get_db), current_user: User = Depe
                 "name": p.name,
                 "stock": p.stock,
                 "price": p.price
-            } for p in low_stock_products
+            } for _, p in low_stock_products
         ],
         "revenueTrend": revenue_trend
     }
+
+
+def _low_stock_query(db: Session):
+    return db.query(LowStockEntry, Product).join(Product, Product.id == LowStockEntry.product_id).order_by(
+        LowStockEntry.stock.asc(), LowStockEntry.since.asc()
+    )
+
+@router.get("/low-stock")
+@query_budget(3)
+def get_low_stock(skip: int = 0, limit: int = 50, db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    """Paginated low-stock list served from the watchlist, most urgent first."""
+    total = db.query(func.count(LowStockEntry.product_id)).scalar() or 0
+    rows = _low_stock_query(db).offset(skip).limit(limit).all()
+    return {
+        "total": total,
+        "items": [
+            {
+                "id": str(p.id),
+                "name": p.name,
+                "category": p.category,
+                "stock": entry.stock,
+                "threshold": entry.threshold,
+                "price": p.price,
+                "since": entry.since
+            } for entry, p in rows
+        ]
+    }
+
+@router.get("/low-stock/thresholds")
+@query_budget(2)
+def list_category_thresholds(db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    return [{"category": t.category, "threshold": t.threshold} for t in db.query(CategoryStockThreshold).all()]
+
+@router.put("/low-stock/thresholds/{category}")
+@query_budget(8, note="constant in the number of products in the category")
+def set_category_threshold(category: str, threshold: int, db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    """Set the reorder threshold for a category and re-evaluate its products."""
+    if threshold < 0:
+        raise HTTPException(status_code=400, detail="Threshold must be non-negative")
+    db.merge(CategoryStockThreshold(category=category, threshold=threshold))
+    db.flush()
+    refresh_low_stock(db, db.query(Product).filter(Product.category == category).all())
+    invalidate(db, DASHBOARD)
+    db.commit()
+    return {"category": category, "threshold": threshold}
+
+@router.delete("/low-stock/thresholds/{category}")
+@query_budget(8, note="constant in the number of products in the category")
+def delete_category_threshold(category: str, db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    """Remove a category threshold; its products fall back to the global default."""
+    existing = db.get(CategoryStockThreshold, category)
+    if not existing:
+        raise HTTPException(status_code=404, detail="No threshold set for this category")
+    db.delete(existing)
+    db.flush()
+    refresh_low_stock(db, db.query(Product).filter(Product.category == category).all())
+    invalidate(db, DASHBOARD)
+    db.commit()
+    return {"message": "Category threshold removed"}
+
+@router.get("/inventory/reconciliation")
+@query_budget(2, note="one grouped query over the whole catalog")
+def get_inventory_reconciliation(db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    """
+    Check every product's stock against its ledger (snapshot + movements since).
+    Read-only: snapshots only advance on the scheduled reconciliation job.
+    """
+    return reconcile_inventory(db, advance_snapshots=False)
+
+@router.get("/inventory/{product_id}/movements")
+@query_budget(2)
+def get_inventory_movements(product_id: UUID, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    """Latest ledger entries of one product, newest first."""
+    return [
+        {
+            "id": m.id,
+            "kind": m.kind,
+            "delta": m.delta,
+            "quantity": m.quantity,
+            "order_id": str(m.order_id) if m.order_id else None,
+            "note": m.note,
+            "created_at": m.created_at
+        } for m in load_movements(db, product_id, min(limit, 1000))
+    ]
+
+@router.get("/cache")
+@query_budget(1, note="admin lookup only")
+def get_cache_stats(current_user: User = Depends(require_admin)):
+    """Per-namespace size and hit/miss counters of this worker's in-process caches."""
+    return cache_stats()
+
+@router.get("/jobs")
+@query_budget(1, note="admin lookup only")
+def get_background_jobs(current_user: User = Depends(require_admin)):
+    """Background jobs scheduled in this worker, with counts and duration of their recent runs."""
+    return scheduler.status()
+
+@router.get("/admission")
+@query_budget(1, note="admin lookup only")
+def get_admission_stats(current_user: User = Depends(require_admin)):
+    """In-flight, queued and shed request counts of this worker's admission control."""
+    return admission.stats()
+
+@router.get("/sql-cache")
+@query_budget(1, note="admin lookup only")
+def get_statement_cache_stats(current_user: User = Depends(require_admin)):
+    """Compiled-statement cache hit rate of this worker since startup."""
+    return statement_cache_stats()
@@ -1,13 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import update
 from sqlalchemy.orm import Session, joinedload, selectinload
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-from ..database import get_db
+from datetime import datetime, timedelta
+from ..database import get_db, SessionLocal
 from ..models.order import Order, OrderItem
+from ..models.archive import ArchivedOrder, ArchivedOrderItem
 from ..models.product import Product
 from ..models.user import User as UserModel
-from ..schemas.order import OrderCreate, OrderResponse, OrderItemResponse, ItemCancelRequest
+from ..schemas.order import (
+    OrderCreate, OrderResponse, OrderItemResponse, ItemCancelRequest, OrderSummaryResponse, OrderQuoteResponse,
+    BulkCancelRequest, BulkCancelResponse,
+)
+from ..services.stock_watch import refresh_low_stock
+from ..services.catalog_feed import publish_product_changes
+from ..services.group_commit import GroupCommitBatcher, GroupCommitTimeout
+from ..services.cache import PRODUCTS, DASHBOARD
+from ..services.invalidation import invalidate
+from ..services.event_stream import order_events, sse_stream
+from ..services.order_feed import (
+    record_order_event, load_changes_since, MAX_CHANGES_PAGE,
+    EVENT_CREATED, EVENT_STATUS_CHANGED, EVENT_ITEMS_CANCELLED,
+)
+from ..services.sales_rollup import record_sales, SALE, REFUND
+from ..services.order_cancellation import cancel_orders, lock_cancellable_orders, TERMINAL_STATUSES
+from ..services.inventory_ledger import record_movements, movement, RESERVATION, DAMAGE_LOSS
+from ..services.statements import get_product_for_update, get_order_with_items
+from ..services.read_models import ORDER_FIELDS, select_order_fields, select_order_summaries
+from ..utils.fields import parse_fields
+from ..config import settings
+from ..core.query_budget import query_budget, no_query_budget
 from ..core.dependencies import get_current_user, require_admin
+from ..core.security import create_quote_token, QUOTE_TOKEN_EXPIRE_SECONDS
+from ..core.responses import negotiated_list_response
 
 router = APIRouter(
     prefix="/orders",
@@ -30,15 +58,19 @@ def calculate_order_totals(order: Order):
             
     return total_original, total_fulfilled, max(0.0, total_original - total_fulfilled)
 
-@router.post("/", response_model=OrderResponse)
-def create_order(order_data: OrderCreate, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
-    """Create a new order with atomic stock deduction and price snapshotting."""
+def _place_order(db: Session, user_id: UUID, order_data: OrderCreate) -> Order:
+    """
+    Validate, lock and deduct stock, then create the order and its side records
+    in the caller's transaction. Raises HTTPException without committing.
+    """
     total_price = 0.0
     db_items = []
+    touched_products = []
+    sales_lines = []
     
     # 1. Validate and Deduct Stock (with pessimistic locking)
     for item in order_data.items:
-        product = db.query(Product).filter(Product.id == item.product_id).with_for_update().first()
+        product = get_product_for_update(db, item.product_id)
         
         if not product:
             raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
@@ -48,6 +80,8 @@ def create_order(order_data: OrderCreate, db: Session = Depends(get_db), current
         
         # Deduct stock
         product.stock -= item.quantity
+        touched_products.append(product)
+        sales_lines.append((product.id, product.category, item.quantity, product.price))
         
         # Calculate price based on current product price (snapshot at order time)
         item_total = product.price * item.quantity
@@ -55,26 +89,89 @@ def create_order(order_data: OrderCreate, db: Session = Depends(get_db), current
         
         # Create Order Item Model
         db_item = OrderItem(
-            product_id=product.id,
+            product=product,
             quantity=item.quantity,
             price=product.price
         )
         db_items.append(db_item)
 
-    # 2. Create Order
+    # 2. Create Order - items are linked through the relationship and inserted on flush
     new_order = Order(
-        user_id=current_user.id,
+        user_id=user_id,
         total=total_price,
-        status="pending"
+        status="pending",
+        items=db_items
     )
     db.add(new_order)
     db.flush()
 
-    # 3. Link Items to Order
-    for db_item in db_items:
-        db_item.order_id = new_order.id
-        db.add(db_item)
-    
+    record_movements(db, [
+        movement(product_id, RESERVATION, -quantity, order_id=new_order.id)
+        for product_id, _, quantity, _ in sales_lines
+    ])
+    refresh_low_stock(db, touched_products)
+    publish_product_changes(db, touched_products)
+    record_sales(db, new_order.created_at, sales_lines, SALE)
+    record_order_event(db, new_order, EVENT_CREATED, {"item_count": len(db_items)})
+    invalidate(db, PRODUCTS, [product.id for product in touched_products])
+    invalidate(db, DASHBOARD)
+    return new_order
+
+def _place_order_for_batch(db: Session, user_id: UUID, customer_phone: Optional[str], order_data: OrderCreate) -> OrderResponse:
+    """Group-commit work item: place the order and snapshot its response before the batch commits."""
+    new_order = _place_order(db, user_id, order_data)
+    _, total_fulfilled, total_refundable = calculate_order_totals(new_order)
+    return OrderResponse(
+        id=new_order.id,
+        readable_id=new_order.readable_id,
+        user_id=new_order.user_id,
+        customer_phone=customer_phone,
+        total=new_order.total,
+        status=new_order.status,
+        created_at=new_order.created_at,
+        items=[
+            OrderItemResponse(
+                id=item.id,
+                product_id=item.product_id,
+                quantity=item.quantity,
+                price=item.price,
+                product_name=item.product_name,
+                status=item.status,
+            ) for item in new_order.items
+        ],
+        total_fulfilled=total_fulfilled,
+        total_refundable=total_refundable,
+    )
+
+order_batcher = GroupCommitBatcher(
+    _place_order_for_batch,
+    name="order-ingest",
+    max_batch=settings.ORDER_GROUP_COMMIT_MAX_BATCH,
+    max_wait_ms=settings.ORDER_GROUP_COMMIT_MAX_WAIT_MS,
+)
+
+@router.post("/", response_model=OrderResponse)
+@query_budget(20, note="2-line cart; one locked SELECT per line")
+def create_order(order_data: OrderCreate, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
+    """
+    Create a new order with atomic stock deduction and price snapshotting.
+    With ORDER_GROUP_COMMIT_ENABLED, concurrent orders share one transaction commit
+    (each still succeeds or fails on its own via a savepoint). An order the batch
+    thread has not picked up within ORDER_GROUP_COMMIT_TIMEOUT_MS is placed alone.
+    """
+    user_id = current_user.id
+    if settings.ORDER_GROUP_COMMIT_ENABLED:
+        customer_phone = current_user.phone
+        # Loading the user may have checked out a connection: hand it back to the
+        # pool while we wait, the batch thread needs one to place this order
+        db.close()
+        try:
+            return order_batcher.submit(user_id, customer_phone, order_data,
+                                        timeout=settings.ORDER_GROUP_COMMIT_TIMEOUT_MS / 1000.0)
+        except GroupCommitTimeout:
+            pass
+
+    new_order = _place_order(db, user_id, order_data)
     db.commit()
     db.refresh(new_order)
     
@@ -84,38 +181,144 @@ def create_order(order_data: OrderCreate, db: Session = Depends(get_db), current
     return new_order
 
 
+@router.post("/quote", response_model=OrderQuoteResponse)
+@query_budget(2)
+def quote_order(order_data: OrderCreate, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
+    """
+    Dry-run a cart: current prices and stock for every line, without taking locks.
+    Applies the same checks as create_order (lines for the same product draw on the
+    same stock), but never blocks or is blocked by real orders. Nothing is reserved.
+    Products that are not active are quoted to customers as not found.
+    """
+    product_ids = {item.product_id for item in order_data.items}
+    query = db.query(Product).filter(Product.id.in_(product_ids))
+    if current_user.role != "admin":
+        query = query.filter(Product.status == "active")
+    products = {product.id: product for product in query.all()} if product_ids else {}
+
+    remaining = {product_id: product.stock for product_id, product in products.items()}
+    lines, token_lines = [], []
+    total_price = 0.0
+    for item in order_data.items:
+        product = products.get(item.product_id)
+        if not product:
+            lines.append({"product_id": item.product_id, "quantity": item.quantity, "available": False, "reason": "not_found"})
+            continue
+
+        line = {
+            "product_id": product.id,
+            "product_name": product.name,
+            "quantity": item.quantity,
+            "unit_price": product.price,
+        }
+        if remaining[product.id] < item.quantity:
+            lines.append({**line, "available": False, "reason": "insufficient_stock"})
+            continue
+
+        remaining[product.id] -= item.quantity
+        line_total = product.price * item.quantity
+        total_price += line_total
+        lines.append({**line, "line_total": line_total, "available": True})
+        token_lines.append([str(product.id), item.quantity, product.price])
+
+    expires_at = datetime.utcnow() + timedelta(seconds=QUOTE_TOKEN_EXPIRE_SECONDS)
+    return {
+        "lines": lines,
+        "total": total_price,
+        "all_available": all(line["available"] for line in lines),
+        "quote_token": create_quote_token(current_user.id, token_lines, total_price, expires_at),
+        "expires_at": expires_at,
+    }
+
 @router.get("/", response_model=List[OrderResponse])
-def read_orders(db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
+@query_budget(2)
+def read_orders(request: Request, fields: Optional[str] = None, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
     """
     Fetch orders with role-based filtering.
     Admin: sees ALL orders in the system.
     Customer: sees ONLY their own orders.
+    Optional `fields=id,status,items` returns only the requested fields; items are
+    only joined when `items` or a derived total is requested.
+
+    Rows are built straight from one Core select (orders LEFT JOIN items when
+    items are needed), fetched before the response starts so no connection is
+    held while a slow client downloads, and encoded as the client negotiates
+    (JSON or MessagePack, gzip / brotli); the shape matches OrderResponse exactly.
     """
-    query = db.query(Order).options(
-        joinedload(Order.items).joinedload(OrderItem.product), 
-        joinedload(Order.user)
-    )
+    selected = parse_fields(fields, ORDER_FIELDS) or list(ORDER_FIELDS)
+    user_filter = None if current_user.role == "admin" else current_user.id
+    return negotiated_list_response(request, select_order_fields(db, selected, user_filter))
+
+@router.get("/summary", response_model=List[OrderSummaryResponse])
+@query_budget(2)
+def read_order_summaries(db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
+    """
+    Lightweight order list (id, date, status, total) for "My Orders" style screens.
+    Same visibility rules as read_orders, but selected from the orders table alone.
+    """
+    user_filter = None if current_user.role == "admin" else current_user.id
+    return select_order_summaries(db, user_filter)
 
-    if current_user.role == "admin":
-        # ADMIN: Fetch ALL orders without any user filter
-        orders = query.order_by(Order.created_at.desc()).all()
-    else:
-        # CUSTOMER: Filter by user_id
-        orders = query.filter(Order.user_id == current_user.id).order_by(Order.created_at.desc()).all()
+@router.get("/changes")
+@query_budget(4, note="+2 for the grace-window re-scan when resuming from a cursor")
+def read_order_changes(since: int = 0, limit: int = 500, db: Session = Depends(get_db), current_user: UserModel = Depends(require_admin)):
+    """
+    Catch-up for the admin order feed: events after cursor `since`, oldest first.
+    Keep calling with the returned cursor while has_more is true, then switch to /orders/feed.
+    Events that committed late are re-sent from a grace window below the cursor,
+    so the same event id can arrive twice; skip ids already seen.
+    """
+    limit = min(max(limit, 1), MAX_CHANGES_PAGE)
+    events = load_changes_since(db, since, limit + 1)
+    has_more = sum(1 for event in events if event["id"] > since) > limit
+    if has_more:
+        events = events[:-1]
+    cursor = events[-1]["id"] if events and events[-1]["id"] > since else since
+    return {"events": events, "cursor": cursor, "has_more": has_more}
 
-    # Dynamic property injection for Pydantic response
-    for order in orders:
-        _, order.total_fulfilled, order.total_refundable = calculate_order_totals(order)
-    
-    return orders
+def _feed_backfill(since: int):
+    db = SessionLocal()
+    try:
+        events = load_changes_since(db, since)
+    finally:
+        db.close()
+    backlog = [(str(event["id"]), event["type"], event) for event in events]
+    if sum(1 for event in events if event["id"] > since) == MAX_CHANGES_PAGE:
+        # Too far behind for a stream replay - page through /orders/changes instead
+        backlog.append((None, "reset", {"reason": "too_many_changes", "cursor": events[-1]["id"]}))
+    return backlog
+
+@router.get("/feed", dependencies=[Depends(require_admin)])
+@no_query_budget("SSE stream: never completes; the backfill runs the /orders/changes query")
+def stream_order_feed(since: Optional[int] = None, last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")):
+    """
+    Live admin feed (Server-Sent Events) of order events: created, status_changed,
+    cancelled, items_cancelled. Event ids are order_events cursors, so a reconnecting
+    client (Last-Event-ID header or `since`) first receives everything it missed,
+    plus the grace-window re-scan (ids it may already have).
+    """
+    cursor = int(last_event_id) if last_event_id and last_event_id.isdigit() else since
+    backfill = None
+    if cursor is not None:
+        async def backfill():
+            return await run_in_threadpool(_feed_backfill, cursor)
+    return StreamingResponse(
+        sse_stream(order_events, None, backfill),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/{order_id}", response_model=OrderResponse)
+@query_budget(3, note="+1 when falling back to the archive")
 def read_order(order_id: UUID, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
-    """Fetch single order detail with calculated totals."""
-    order = db.query(Order).options(
-        joinedload(Order.items).joinedload(OrderItem.product),
-        joinedload(Order.user)
-    ).filter(Order.id == order_id).first()
+    """Fetch single order detail with calculated totals. Falls back to the archive for old terminal orders."""
+    order = get_order_with_items(db, order_id)
+
+    if not order:
+        order = db.query(ArchivedOrder).options(
+            joinedload(ArchivedOrder.items).joinedload(ArchivedOrderItem.product),
+            joinedload(ArchivedOrder.user)
+        ).filter(ArchivedOrder.id == order_id).first()
 
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -127,17 +330,18 @@ def read_order(order_id: UUID, db: Session = Depends(get_db), current_user: User
     return order
 
 @router.put("/{order_id}/status", response_model=OrderResponse)
+@query_budget(10)
 def update_order_status(order_id: UUID, status: str, db: Session = Depends(get_db), current_user: UserModel = Depends(require_admin)):
     """
     Update order status with strict state machine enforcement.
     Also cascades status changes to items when moving to shipped/delivered.
     """
-    order = db.query(Order).options(joinedload(Order.items)).filter(Order.id == order_id).first()
+    order = db.query(Order).filter(Order.id == order_id).with_for_update().first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
     # Terminal State Check
-    if order.status in ["delivered", "cancelled"]:
+    if order.status in TERMINAL_STATUSES:
         raise HTTPException(status_code=400, detail=f"Cannot modify order in terminal state: {order.status}")
 
     # State Machine Validation
@@ -154,31 +358,66 @@ def update_order_status(order_id: UUID, status: str, db: Session = Depends(get_d
             detail=f"Illegal transition from {order.status} to {status}. Allowed: {valid_transitions.get(order.status, [])}"
         )
 
-    # Delegate to cancel endpoint for full cancellation
+    # Full cancellation reuses the order row already locked above
     if status == "cancelled":
-        return cancel_order(order_id, db, current_user)
+        return _cancel_locked_order(db, order)
 
+    previous_status = order.status
     order.status = status
 
     # Item Status Synchronization (addresses GAP 1 from audit)
     # Side-effect: When order moves to shipped or delivered, items must follow
     if status == "shipped":
-        for item in order.items:
-            # Only transition 'active' items to 'shipped'. Cancelled items remain cancelled.
-            if item.status == "active":
-                item.status = "shipped"
+        # Only transition 'active' items to 'shipped'. Cancelled items remain cancelled.
+        _cascade_item_status(db, order.id, "active", "shipped")
     elif status == "delivered":
-        for item in order.items:
-            # Transition 'shipped' items to 'delivered'
-            if item.status == "shipped":
-                item.status = "delivered"
+        # Transition 'shipped' items to 'delivered'
+        _cascade_item_status(db, order.id, "shipped", "delivered")
 
+    record_order_event(db, order, EVENT_STATUS_CHANGED, {"previous_status": previous_status})
+    invalidate(db, DASHBOARD)
     db.commit()
     db.refresh(order)
     _, order.total_fulfilled, order.total_refundable = calculate_order_totals(order)
     return order
 
+def _cascade_item_status(db: Session, order_id: UUID, from_status: str, to_status: str):
+    db.execute(
+        update(OrderItem).where(OrderItem.order_id == order_id, OrderItem.status == from_status).values(status=to_status),
+        execution_options={"synchronize_session": False}
+    )
+
+def _cancel_locked_order(db: Session, order: Order) -> Order:
+    cancel_orders(db, [order.id])
+    db.commit()
+    # One round trip for the response instead of lazy loads per item
+    order = get_order_with_items(db, order.id, refresh=True)
+    _, order.total_fulfilled, order.total_refundable = calculate_order_totals(order)
+    return order
+
+@router.post("/bulk-cancel", response_model=BulkCancelResponse)
+@query_budget(13, note="constant in the number of orders")
+def bulk_cancel_orders(cancel_data: BulkCancelRequest, db: Session = Depends(get_db), current_user: UserModel = Depends(require_admin)):
+    """
+    Admin bulk cancellation: same restock semantics as cancel_order, with a fixed
+    number of statements however many orders are cancelled. Orders that are
+    missing or already terminal are reported as skipped.
+    """
+    order_ids = list(dict.fromkeys(cancel_data.order_ids))
+    if len(order_ids) > settings.ORDER_BULK_CANCEL_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {settings.ORDER_BULK_CANCEL_MAX_SIZE} orders per request")
+
+    locked = lock_cancellable_orders(db, order_ids)
+    cancelled = cancel_orders(db, [order.id for order in locked])
+    db.commit()
+    cancelled_ids = {order.id for order in cancelled}
+    return {
+        "cancelled": [order_id for order_id in order_ids if order_id in cancelled_ids],
+        "skipped": [order_id for order_id in order_ids if order_id not in cancelled_ids],
+    }
+
 @router.post("/{order_id}/cancel", response_model=OrderResponse)
+@query_budget(15)
 def cancel_order(order_id: UUID, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
     """
     Scenario A: Full Order Cancellation
@@ -186,7 +425,7 @@ def cancel_order(order_id: UUID, db: Session = Depends(get_db), current_user: Us
     - Customers can only cancel if 'pending'
     - Admins can cancel anytime before terminal state
     """
-    order = db.query(Order).options(selectinload(Order.items).selectinload(OrderItem.product)).filter(Order.id == order_id).with_for_update().first()
+    order = db.query(Order).filter(Order.id == order_id).with_for_update().first()
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -198,23 +437,15 @@ def cancel_order(order_id: UUID, db: Session = Depends(get_db), current_user: Us
         if order.status != "pending":
             raise HTTPException(status_code=400, detail="Customers can only cancel pending orders")
     
-    if order.status in ["delivered", "cancelled"]:
+    if order.status in TERMINAL_STATUSES:
         raise HTTPException(status_code=400, detail="Order is already in a terminal state")
 
-    # RESTOCK Logic for Full Cancellation
-    for item in order.items:
-        if item.status != "cancelled":
-            item.product.stock += item.quantity
-            item.status = "cancelled"
-            
-    order.status = "cancelled"
-    db.commit()
-    db.refresh(order)
-    _, order.total_fulfilled, order.total_refundable = calculate_order_totals(order)
-    return order
+    # RESTOCK Logic for Full Cancellation: set-based, see services/order_cancellation.py
+    return _cancel_locked_order(db, order)
 
 
 @router.post("/{order_id}/items/cancel", response_model=OrderResponse, dependencies=[Depends(require_admin)])
+@query_budget(16)
 def cancel_order_items(order_id: UUID, cancel_data: ItemCancelRequest, db: Session = Depends(get_db)):
     """
     Scenario B: Partial Cancellation (Warehouse Damage)
@@ -222,7 +453,7 @@ def cancel_order_items(order_id: UUID, cancel_data: ItemCancelRequest, db: Sessi
     - DOES NOT restock items (marked as loss)
     - Updates order status to 'partially_shipped' if not already deeper in flow
     """
-    order = db.query(Order).options(selectinload(Order.items)).filter(Order.id == order_id).with_for_update().first()
+    order = db.query(Order).options(selectinload(Order.items).selectinload(OrderItem.product)).filter(Order.id == order_id).with_for_update().first()
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -230,10 +461,12 @@ def cancel_order_items(order_id: UUID, cancel_data: ItemCancelRequest, db: Sessi
     if order.status in ["shipped", "delivered", "cancelled"]:
         raise HTTPException(status_code=400, detail=f"Cannot cancel items for order in state: {order.status}")
 
-    cancel_ids = [item.order_item_id for item in cancel_data.items]
+    cancel_reasons = {item.order_item_id: item.reason or "damaged" for item in cancel_data.items}
     found_any = False
+    cancelled_ids = []
+    sales_lines = []
     for item in order.items:
-        if item.id in cancel_ids:
+        if item.id in cancel_reasons:
             # Immutability Guard: Only allow cancelling 'active' items
             if item.status != "active":
                 raise HTTPException(
@@ -242,6 +475,9 @@ def cancel_order_items(order_id: UUID, cancel_data: ItemCancelRequest, db: Sessi
                 )
             
             item.status = "cancelled"
+            item.cancel_reason = cancel_reasons[item.id]
+            cancelled_ids.append(str(item.id))
+            sales_lines.append((item.product_id, item.product.category if item.product else None, item.quantity, item.price))
             found_any = True
             
     if not found_any:
@@ -251,6 +487,14 @@ def cancel_order_items(order_id: UUID, cancel_data: ItemCancelRequest, db: Sessi
     if order.status == "processing":
         order.status = "partially_shipped"
 
+    # The goods are lost, not back on the shelf: audit only, stock unchanged
+    record_movements(db, [
+        movement(item.product_id, DAMAGE_LOSS, 0, item.quantity, order_id=order.id, note=item.cancel_reason)
+        for item in order.items if item.id in cancel_reasons
+    ])
+    record_sales(db, order.created_at, sales_lines, REFUND)
+    record_order_event(db, order, EVENT_ITEMS_CANCELLED, {"item_ids": cancelled_ids})
+    invalidate(db, DASHBOARD)
     db.commit()
     db.refresh(order)
     _, order.total_fulfilled, order.total_refundable = calculate_order_totals(order)
@@ -1,41 +1,121 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from ..database import get_db
 from ..models.product import Product as ProductModel
-from ..schemas.product import ProductCreate, ProductUpdate, ProductResponse
+from ..config import settings
+from ..schemas.product import (
+    ProductCreate, ProductUpdate, ProductResponse, AdminProductResponse, ProductBatchRequest, ProductBatchResponse,
+)
+from ..core.query_budget import query_budget, no_query_budget
 from ..core.dependencies import require_admin, get_current_user, get_current_user_optional
+from ..core.responses import negotiated_list_response
+from ..services.stock_watch import refresh_low_stock
+from ..services.catalog_feed import publish_product_changes, publish_product_removed
+from ..services.event_stream import catalog_events, sse_stream
+from ..services.inventory_ledger import record_movements, movement, MANUAL_ADJUSTMENT
+from ..services.cache import get_cache, PRODUCTS, DASHBOARD
+from ..services.invalidation import invalidate
+from ..services.read_models import PRODUCT_FIELDS, ADMIN_PRODUCT_FIELDS, select_product_fields
+from ..services.statements import get_product_for_update
+from ..utils.fields import parse_fields
 
 router = APIRouter(
     prefix="/products",
     tags=["Products"]
 )
 
+product_cache = get_cache(PRODUCTS, settings.PRODUCT_CACHE_TTL_SECONDS)
+
+def _invalidate_product(db: Session, product_id):
+    invalidate(db, PRODUCTS, [product_id])
+    invalidate(db, DASHBOARD)
+
 @router.get("/catalog/public", response_model=List[ProductResponse])
-def read_products_public(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Public Catalog: Strictly returns ONLY active products."""
-    products = db.query(ProductModel).filter(ProductModel.status == "active").offset(skip).limit(limit).all()
-    return products
+@query_budget(1)
+def read_products_public(request: Request, skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """Public Catalog: Strictly returns ONLY active products. `fields=` selects a subset of columns."""
+    selected = parse_fields(fields, PRODUCT_FIELDS) or list(PRODUCT_FIELDS)
+    return negotiated_list_response(request, select_product_fields(db, selected, True, skip, limit))
+
+@router.get("/catalog/stream")
+@no_query_budget("SSE stream: never completes, no statements once subscribed")
+def stream_catalog_changes(last_event_id: Optional[str] = None, last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")):
+    """
+    Server-Sent Events feed of catalog deltas (price, stock, visibility).
+    Events: product.updated (active product changed), product.removed (deleted or
+    deactivated), reset (resume cursor unavailable - refetch the catalog).
+    Resume with the Last-Event-ID header or the last_event_id query parameter.
+    """
+    return StreamingResponse(
+        sse_stream(catalog_events, last_event_id_header or last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-@router.get("/manage/admin", response_model=List[ProductResponse], dependencies=[Depends(require_admin)])
-def read_products_admin(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Admin Management: Returns all products regardless of status."""
-    products = db.query(ProductModel).offset(skip).limit(limit).all()
-    return products
+@router.get("/manage/admin", response_model=List[AdminProductResponse], dependencies=[Depends(require_admin)])
+@query_budget(2)
+def read_products_admin(request: Request, skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """Admin Management: Returns all products regardless of status. `fields=` selects a subset of columns."""
+    selected = parse_fields(fields, ADMIN_PRODUCT_FIELDS) or list(ADMIN_PRODUCT_FIELDS)
+    return negotiated_list_response(request, select_product_fields(db, selected, False, skip, limit))
 
 @router.get("/detail/{product_id}", response_model=ProductResponse)
+@query_budget(2)
 def read_product(product_id: UUID, db: Session = Depends(get_db), current_user = Depends(get_current_user_optional)):
-    """Individual Product Detail."""
-    query = db.query(ProductModel).filter(ProductModel.id == product_id)
-    if not current_user or current_user.role != "admin":
-        query = query.filter(ProductModel.status == "active")
-    product = query.first()
+    """Individual Product Detail. Served from the product cache; visibility is checked on every hit."""
+    product = product_cache.get(str(product_id))
+    if product is None:
+        db_product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
+        if db_product is not None:
+            product = ProductResponse.model_validate(db_product).model_dump()
+            product_cache.set(str(product_id), product)
+    if product is not None and (not current_user or current_user.role != "admin") and product["status"] != "active":
+        product = None
     if product is None:
         raise HTTPException(status_code=404, detail="Product not found or inactive")
     return product
 
-@router.post("/", response_model=ProductResponse, dependencies=[Depends(require_admin)])
+@router.post("/batch", response_model=ProductBatchResponse)
+@query_budget(2)
+def read_products_batch(batch: ProductBatchRequest, db: Session = Depends(get_db), current_user = Depends(get_current_user_optional)):
+    """
+    Batch Product Lookup for cart / reorder screens: one indexed query for many ids or SKUs.
+    Same visibility rule as read_product - non-admins only see active products.
+    """
+    ids = list(dict.fromkeys(batch.ids))
+    skus = list(dict.fromkeys(batch.skus))
+    if len(ids) + len(skus) > settings.PRODUCT_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {settings.PRODUCT_BATCH_MAX_SIZE} ids and SKUs per request")
+    if not ids and not skus:
+        return {"products": [], "missing_ids": [], "missing_skus": []}
+
+    lookups = []
+    if ids:
+        lookups.append(ProductModel.id.in_(ids))
+    if skus:
+        lookups.append(ProductModel.sku.in_(skus))
+    query = db.query(ProductModel).filter(or_(*lookups))
+    if not current_user or current_user.role != "admin":
+        query = query.filter(ProductModel.status == "active")
+    found = query.all()
+
+    by_id = {product.id: product for product in found}
+    by_sku = {product.sku: product for product in found}
+    # Preserve request order: ids first, then SKUs, without duplicates
+    ordered = list({product.id: product for product in
+                    [by_id[i] for i in ids if i in by_id] + [by_sku[s] for s in skus if s in by_sku]}.values())
+    return {
+        "products": ordered,
+        "missing_ids": [i for i in ids if i not in by_id],
+        "missing_skus": [s for s in skus if s not in by_sku],
+    }
+
+@router.post("/", response_model=AdminProductResponse, dependencies=[Depends(require_admin)])
+@query_budget(10, note="includes pg_notify cache invalidations and SSE fan-out")
 def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     existing = db.query(ProductModel).filter(ProductModel.sku == product.sku).first()
     if existing:
@@ -45,13 +125,21 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Invalid status")
     db_product = ProductModel(**product.model_dump())
     db.add(db_product)
+    db.flush()
+    if db_product.stock:
+        record_movements(db, [movement(db_product.id, MANUAL_ADJUSTMENT, db_product.stock, note="initial stock")])
+    refresh_low_stock(db, [db_product])
+    publish_product_changes(db, [db_product])
+    _invalidate_product(db, db_product.id)
     db.commit()
     db.refresh(db_product)
     return db_product
 
-@router.put("/{product_id}", response_model=ProductResponse, dependencies=[Depends(require_admin)])
+@router.put("/{product_id}", response_model=AdminProductResponse, dependencies=[Depends(require_admin)])
+@query_budget(7, note="includes pg_notify cache invalidations")
 def update_product(product_id: UUID, product_update: ProductUpdate, db: Session = Depends(get_db)):
-    db_product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
+    # Locked like the order paths, so previous_stock cannot go stale before the ledger row is written
+    db_product = get_product_for_update(db, product_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     update_data = product_update.model_dump(exclude_unset=True)
@@ -60,13 +148,21 @@ def update_product(product_id: UUID, product_update: ProductUpdate, db: Session
         if status not in ["active", "inactive"]:
             raise HTTPException(status_code=400, detail="Invalid status")
         update_data["status"] = status
+    previous_stock = db_product.stock
     for key, value in update_data.items():
         setattr(db_product, key, value)
+    if db_product.stock != previous_stock:
+        record_movements(db, [movement(db_product.id, MANUAL_ADJUSTMENT, db_product.stock - previous_stock, note="product update")])
+    if update_data.keys() & {"stock", "status", "category", "reorder_threshold"}:
+        refresh_low_stock(db, [db_product])
+    publish_product_changes(db, [db_product])
+    _invalidate_product(db, db_product.id)
     db.commit()
     db.refresh(db_product)
     return db_product
 
-@router.patch("/{product_id}/status", response_model=ProductResponse, dependencies=[Depends(require_admin)])
+@router.patch("/{product_id}/status", response_model=AdminProductResponse, dependencies=[Depends(require_admin)])
+@query_budget(8, note="includes pg_notify cache invalidations")
 def toggle_product_status(product_id: UUID, status: str, db: Session = Depends(get_db)):
     status = status.strip().lower()
     if status not in ["active", "inactive"]:
@@ -75,15 +171,21 @@ def toggle_product_status(product_id: UUID, status: str, db: Session = Depends(g
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     db_product.status = status
+    refresh_low_stock(db, [db_product])
+    publish_product_changes(db, [db_product])
+    _invalidate_product(db, db_product.id)
     db.commit()
     db.refresh(db_product)
     return db_product
 
 @router.delete("/{product_id}", dependencies=[Depends(require_admin)])
+@query_budget(6, note="includes pg_notify cache invalidations and SSE fan-out")
 def delete_product(product_id: UUID, db: Session = Depends(get_db)):
     db_product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     db.delete(db_product)
+    publish_product_removed(db, product_id)
+    _invalidate_product(db, product_id)
     db.commit()
     return {"message": "Product deleted successfully"}
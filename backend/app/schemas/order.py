@@ -18,6 +18,14 @@ class ItemCancel(BaseModel):
 class ItemCancelRequest(BaseModel):
     items: List[ItemCancel]
 
+class BulkCancelRequest(BaseModel):
+    order_ids: List[UUID]
+
+class BulkCancelResponse(BaseModel):
+    cancelled: List[UUID]
+    # Requested orders that do not exist or are already delivered / cancelled
+    skipped: List[UUID]
+
 class OrderItemResponse(BaseModel):
     id: UUID
     product_id: UUID
@@ -44,3 +52,33 @@ class OrderResponse(BaseModel):
     total_refundable: float
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class OrderSummaryResponse(BaseModel):
+    """Lightweight order row for list screens - read from the orders table alone."""
+    id: UUID
+    readable_id: Optional[int] = None
+    total: float
+    status: str
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class QuoteLine(BaseModel):
+    product_id: UUID
+    product_name: Optional[str] = None
+    quantity: int
+    unit_price: Optional[float] = None
+    line_total: float = 0.0
+    available: bool
+    # "not_found" or "insufficient_stock" when the line cannot be fulfilled
+    reason: Optional[str] = None
+
+
+class OrderQuoteResponse(BaseModel):
+    lines: List[QuoteLine]
+    total: float
+    all_available: bool
+    quote_token: str
+    expires_at: datetime
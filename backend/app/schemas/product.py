@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -15,7 +15,7 @@ class ProductBase(BaseModel):
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
 class ProductCreate(ProductBase):
-    pass
+    reorder_threshold: Optional[int] = None
 
 class ProductUpdate(BaseModel):
     name: Optional[str] = None
@@ -24,9 +24,24 @@ class ProductUpdate(BaseModel):
     stock: Optional[int] = None
     status: Optional[str] = None
     category: Optional[str] = None
+    reorder_threshold: Optional[int] = None
 
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
 class ProductResponse(ProductBase):
     id: UUID
     created_at: datetime
+
+class AdminProductResponse(ProductResponse):
+    # Internal reorder threshold: admin views only, never the public catalog
+    reorder_threshold: Optional[int] = None
+
+class ProductBatchRequest(BaseModel):
+    ids: List[UUID] = []
+    skus: List[str] = []
+
+class ProductBatchResponse(BaseModel):
+    products: List[ProductResponse]
+    # Requested ids / skus that do not exist or are not visible to the caller
+    missing_ids: List[UUID] = []
+    missing_skus: List[str] = []
@@ -0,0 +1,47 @@
+"""
+Post-commit callbacks
+Side effects (notifications, pushes to subscribers) must only fire once the
+database transaction that caused them has actually committed.
+"""
+import logging
+from typing import Callable
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_CALLBACKS_KEY = "after_commit_callbacks"
+
+
+def run_after_commit(db: Session, callback: Callable[[], None]) -> None:
+    """Queue a callback to run after the session's current transaction commits."""
+    db.info.setdefault(_CALLBACKS_KEY, []).append(callback)
+
+
+def callbacks_mark(db: Session) -> int:
+    """Position in the pending callback list, for use with discard_callbacks_since."""
+    return len(db.info.get(_CALLBACKS_KEY, []))
+
+
+def discard_callbacks_since(db: Session, mark: int) -> None:
+    """Drop callbacks queued after `mark` (work rolled back to a savepoint)."""
+    del db.info.get(_CALLBACKS_KEY, [])[mark:]
+
+
+@event.listens_for(Session, "after_commit")
+def _run_callbacks(session: Session):
+    # Savepoint releases also fire after_commit; only the outermost commit counts
+    if session.in_nested_transaction():
+        return
+    for callback in session.info.pop(_CALLBACKS_KEY, []):
+        try:
+            callback()
+        except Exception:
+            logger.exception("after-commit callback failed")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_callbacks(session: Session, previous_transaction):
+    # Savepoint rollbacks discard their own callbacks via discard_callbacks_since
+    if previous_transaction.parent is None:
+        session.info.pop(_CALLBACKS_KEY, None)
@@ -0,0 +1,86 @@
+"""
+In-process caches
+Small TTL caches for hot reads (products, users, dashboard). Every write path
+publishes keyed invalidations (see services/invalidation.py), so entries are
+evicted on every worker, not just the one that handled the write.
+"""
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional
+
+PRODUCTS = "products"
+USERS = "users"
+DASHBOARD = "dashboard"
+
+ALL_KEYS = "*"
+
+
+class TTLCache:
+    def __init__(self, namespace: str, ttl_seconds: float, maxsize: int = 10000):
+        self.namespace = namespace
+        self.ttl = ttl_seconds
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                # Dicts keep insertion order: drop the oldest entry
+                self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def evict(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+_registry: Dict[str, TTLCache] = {}
+
+
+def get_cache(namespace: str, ttl_seconds: float, maxsize: int = 10000) -> TTLCache:
+    """Return the cache for a namespace, creating it on first use."""
+    cache = _registry.get(namespace)
+    if cache is None:
+        cache = _registry.setdefault(namespace, TTLCache(namespace, ttl_seconds, maxsize))
+    return cache
+
+
+def evict(namespace: str, key: str) -> None:
+    cache = _registry.get(namespace)
+    if cache is None:
+        return
+    if key == ALL_KEYS:
+        cache.clear()
+    else:
+        cache.evict(key)
+
+
+def flush_all() -> None:
+    for cache in list(_registry.values()):
+        cache.clear()
+
+
+def cache_stats() -> dict:
+    return {namespace: cache.stats() for namespace, cache in _registry.items()}
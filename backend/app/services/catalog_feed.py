@@ -0,0 +1,37 @@
+"""
+Catalog change feed
+Turns product writes into compact deltas on the catalog event channel.
+Payloads are captured before commit (ORM objects expire on commit) and
+reach subscribers on every worker only once the transaction has committed.
+"""
+from typing import Iterable
+from sqlalchemy.orm import Session
+from .event_fanout import broadcast
+from .event_stream import catalog_events
+
+PRODUCT_UPDATED = "product.updated"
+PRODUCT_REMOVED = "product.removed"
+
+
+def _delta(product) -> tuple:
+    # Inactive products must never reach the public catalog: clients just drop them
+    if product.status != "active":
+        return PRODUCT_REMOVED, {"id": str(product.id)}
+    return PRODUCT_UPDATED, {
+        "id": str(product.id),
+        "sku": product.sku,
+        "name": product.name,
+        "price": product.price,
+        "stock": product.stock,
+        "category": product.category,
+    }
+
+
+def publish_product_changes(db: Session, products: Iterable) -> None:
+    """Queue catalog deltas for the given products, sent after the current transaction commits."""
+    deltas = [_delta(product) for product in {product.id: product for product in products}.values()]
+    broadcast(db, catalog_events, [(event_type, data, None) for event_type, data in deltas])
+
+
+def publish_product_removed(db: Session, product_id) -> None:
+    broadcast(db, catalog_events, [(PRODUCT_REMOVED, {"id": str(product_id)}, None)])
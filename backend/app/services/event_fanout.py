@@ -0,0 +1,62 @@
+"""
+Cross-worker fan-out for the SSE channels
+Subscribers are connected to whichever worker accepted their request, so a
+write must reach every worker's EventChannel, not just the one that handled it.
+On Postgres, publishers pg_notify each event inside the write transaction and
+every worker's listener (services/invalidation.py) publishes it to its local
+channel, so only committed events are delivered. Event ids are assigned here,
+before the NOTIFY, so every worker publishes an event under the same id and a
+client can resume on any of them. When the listener reconnects,
+events sent in between are lost: local subscribers are told to reset.
+
+Without a listener (SQLite tooling, unsupported driver) events are published
+locally after commit, which is only complete with a single worker.
+"""
+import logging
+from typing import Iterable, Optional, Tuple
+import orjson
+from sqlalchemy.orm import Session
+from ..config import settings
+from .after_commit import run_after_commit
+from .event_stream import EventChannel, catalog_events, order_events
+from .invalidation import listener, notify, MAX_PAYLOAD_BYTES
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = {channel.name: channel for channel in (catalog_events, order_events)}
+
+
+def broadcast(db: Session, channel: EventChannel, events: Iterable[Tuple[str, dict, Optional[str]]]) -> None:
+    """Publish (event_type, data, event_id) events on every worker once the current transaction commits."""
+    events = [(event_type, data, event_id or channel.new_event_id()) for event_type, data, event_id in events]
+    if not events:
+        return
+    local = events
+    if db.get_bind().dialect.name == "postgresql" and listener.supported:
+        payloads, local = [], []
+        for event in events:
+            event_type, data, event_id = event
+            payload = orjson.dumps({"c": channel.name, "t": event_type, "d": data, "i": event_id}).decode()
+            if len(payload) > MAX_PAYLOAD_BYTES:
+                logger.warning(f"{channel.name} event too large for NOTIFY; published on this worker only")
+                local.append(event)
+            else:
+                payloads.append(payload)
+        notify(db, settings.EVENT_FANOUT_CHANNEL, payloads)
+    if local:
+        run_after_commit(db, lambda: [
+            channel.publish(event_type, data, event_id=event_id) for event_type, data, event_id in local
+        ])
+
+
+def _deliver(payload: str) -> None:
+    event = orjson.loads(payload)
+    CHANNELS[event["c"]].publish(event["t"], event["d"], event_id=event["i"])
+
+
+def _reset_subscribers() -> None:
+    for channel in CHANNELS.values():
+        channel.reset_subscribers("events_lost")
+
+
+listener.register(settings.EVENT_FANOUT_CHANNEL, _deliver, on_reconnect=_reset_subscribers)
@@ -0,0 +1,193 @@
+"""
+In-process event channels for Server-Sent Events
+Write handlers publish compact deltas after commit (through
+services/event_fanout.py, so every worker's channel sees them); SSE endpoints subscribe.
+Each channel keeps a bounded history so reconnecting clients can resume from
+their Last-Event-ID, on any worker: ids are assigned once by the publishing
+worker and travel with the event, and every worker's listener receives
+notifications in the same (commit) order, so a client resumes from the
+position of its last id in the local history. Subscribers are an asyncio.Queue each, so thousands of
+idle connections cost one small coroutine apiece.
+"""
+import asyncio
+import itertools
+import threading
+import uuid
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+import orjson
+
+HEARTBEAT_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class _Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        # Set once the subscriber can no longer be fed a complete stream
+        self.reset_reason: Optional[str] = None
+
+    def deliver(self, event):
+        if self.reset_reason:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: stop feeding it and make it reset on its next read
+            self.reset_reason = "subscriber_overflow"
+
+    def reset(self, reason: str):
+        if self.reset_reason:
+            return
+        self.reset_reason = reason
+        try:
+            # Wake the reader; a full queue means it is about to read anyway
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+class EventChannel:
+    """
+    Thread-safe fan-out channel. Event ids are "<epoch>-<n>" with a random epoch
+    per process, so ids minted by different workers (or restarts) never collide.
+    Resuming looks the id up in the history: an id this worker never saw, or no
+    longer holds, gets a reset instead of silently missing events.
+    """
+
+    def __init__(self, name: str, history_size: int = 2000):
+        self.name = name
+        self.epoch = uuid.uuid4().hex[:12]
+        self._ids = itertools.count(1)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history_size)  # (local seq, event_id, event_type, data)
+        self._subscribers = set()
+
+    def new_event_id(self) -> str:
+        """A fresh id, assigned by the publishing worker before the event fans out."""
+        return f"{self.epoch}-{next(self._ids)}"
+
+    def publish(self, event_type: str, data: dict, event_id: Optional[str] = None) -> str:
+        """
+        Publish one event to every subscriber. Safe to call from any thread.
+        `event_id` overrides the generated id for channels backed by a durable log.
+        """
+        with self._lock:
+            event = (next(self._seq), event_id or self.new_event_id(), event_type, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # Event loop already closed
+                with self._lock:
+                    self._subscribers.discard(subscriber)
+        return event[1]
+
+    def reset_subscribers(self, reason: str) -> None:
+        """Send every current subscriber a "reset" event and end its stream (events were lost upstream)."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.reset, reason)
+            except RuntimeError:
+                with self._lock:
+                    self._subscribers.discard(subscriber)
+
+    @staticmethod
+    def _resume_position(history: List[tuple], last_event_id: str) -> Optional[int]:
+        """Local seq of `last_event_id` in the history snapshot, None when it is not there."""
+        for seq, event_id, _, _ in reversed(history):
+            if event_id == last_event_id:
+                return seq
+        return None
+
+    async def subscribe(
+        self,
+        last_event_id: Optional[str] = None,
+        backfill: Optional[Callable[[], Awaitable[List[tuple]]]] = None,
+    ) -> AsyncIterator[Optional[tuple]]:
+        """
+        Yield events as (event_id, event_type, data). Yields None on idle timeouts so
+        callers can send heartbeats. Yields a "reset" event when the cursor cannot be
+        honoured (id not in this worker's history, the subscriber overflowed, or
+        reset_subscribers was called), then ends.
+
+        Channels backed by a durable log pass `backfill` instead of a cursor: it runs
+        after the subscriber is registered, so nothing committed in between is lost,
+        and live events already returned by it are skipped.
+        """
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            # Snapshot history and register atomically so no event falls in between
+            history = list(self._history)
+            self._subscribers.add(subscriber)
+        try:
+            replayed = set()
+            if backfill is not None:
+                for event in await backfill():
+                    replayed.add(event[0])
+                    yield event
+            if last_event_id:
+                cursor = self._resume_position(history, last_event_id)
+                if cursor is None:
+                    yield (None, "reset", {"reason": "history_unavailable"})
+                else:
+                    for seq, event_id, event_type, data in history:
+                        if seq > cursor:
+                            yield (event_id, event_type, data)
+            while True:
+                if subscriber.reset_reason:
+                    yield (None, "reset", {"reason": subscriber.reset_reason})
+                    return
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event is None:
+                    continue
+                _, event_id, event_type, data = event
+                if event_id in replayed:
+                    continue
+                yield (event_id, event_type, data)
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+async def sse_stream(
+    channel: EventChannel,
+    last_event_id: Optional[str] = None,
+    backfill: Optional[Callable[[], Awaitable[List[tuple]]]] = None,
+) -> AsyncIterator[bytes]:
+    """Format a channel subscription as a text/event-stream body."""
+    yield b"retry: 3000\n\n"
+    # aclosing: unregister the subscriber as soon as the client disconnects
+    async with aclosing(channel.subscribe(last_event_id, backfill)) as events:
+        async for item in events:
+            if item is None:
+                yield b": keepalive\n\n"
+                continue
+            event_id, event_type, data = item
+            chunk = b""
+            if event_id:
+                chunk += f"id: {event_id}\n".encode()
+            chunk += f"event: {event_type}\n".encode() + b"data: " + orjson.dumps(data) + b"\n\n"
+            yield chunk
+
+
+# Catalog price / stock / visibility changes
+catalog_events = EventChannel("catalog")
+
+# Admin order feed; durable history lives in the order_events table
+order_events = EventChannel("orders", history_size=0)
@@ -0,0 +1,138 @@
+"""
+Group commit
+Collects concurrent work items for a few milliseconds (or until a batch is
+full) and runs them in one database transaction, so a burst of N requests
+pays for one commit / WAL flush instead of N. Each item runs inside its own
+savepoint: a failing item is rolled back alone and its caller gets the error,
+while the rest of the batch commits together. A caller that waits longer than
+its timeout withdraws its item if the batch thread has not started it yet, and
+can then do the work in its own transaction.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, List, Optional
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from .after_commit import callbacks_mark, discard_callbacks_since
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitTimeout(TimeoutError):
+    """The item was withdrawn before it ran: nothing was done, the caller may run it alone."""
+
+
+class _WorkItem:
+    __slots__ = ("args", "future")
+
+    def __init__(self, args: tuple):
+        self.args = args
+        self.future: Future = Future()
+
+
+class GroupCommitBatcher:
+    """
+    `work_fn(db, *args)` does one unit of work without committing and returns its
+    result. Callers block in `submit` until the batch holding their item commits,
+    so they must not hold a pooled connection meanwhile: the batch thread needs one.
+    """
+
+    def __init__(self, work_fn: Callable, name: str, max_batch: int, max_wait_ms: int,
+                 session_factory: Callable[[], Session] = SessionLocal):
+        self.work_fn = work_fn
+        self.name = name
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+        self.session_factory = session_factory
+        self._queue: "queue.Queue[_WorkItem]" = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, *args, timeout: Optional[float] = None):
+        """
+        Queue one work item and wait for its individual result (or exception).
+        After `timeout` seconds an item the batch thread has not started yet is
+        withdrawn and GroupCommitTimeout raised. One already running cannot be
+        withdrawn (its batch may be committing), so the caller keeps waiting for it.
+        """
+        self._ensure_started()
+        item = _WorkItem(args)
+        self._queue.put(item)
+        try:
+            return item.future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if item.future.cancel():
+                logger.warning(f"{self.name}: item not started within {timeout}s, withdrawn")
+                raise GroupCommitTimeout(f"{self.name}: not started within {timeout}s")
+            return item.future.result()
+
+    @staticmethod
+    def _claim(item: _WorkItem) -> bool:
+        """Mark the item running; False when its caller already withdrew it."""
+        return item.future.running() or item.future.set_running_or_notify_cancel()
+
+    def _collect(self) -> List[_WorkItem]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._run_batch(batch)
+            except Exception:
+                logger.exception(f"{self.name}: batch failed, retrying items individually")
+                # e.g. a deadlock or failed commit: give every item its own transaction
+                for item in batch:
+                    if not item.future.done():
+                        self._run_batch([item])
+
+    def _run_batch(self, batch: List[_WorkItem]):
+        db = self.session_factory()
+        try:
+            succeeded = []
+            for item in batch:
+                if not self._claim(item):
+                    continue
+                mark = callbacks_mark(db)
+                savepoint = db.begin_nested()
+                try:
+                    result = self.work_fn(db, *item.args)
+                    savepoint.commit()
+                    succeeded.append((item, result))
+                except Exception as exc:
+                    savepoint.rollback()
+                    discard_callbacks_since(db, mark)
+                    item.future.set_exception(exc)
+            if succeeded:
+                db.commit()
+            for item, result in succeeded:
+                item.future.set_result(result)
+        except Exception as exc:
+            db.rollback()
+            if len(batch) == 1 and not batch[0].future.done():
+                batch[0].future.set_exception(exc)
+                return
+            raise
+        finally:
+            db.close()
@@ -0,0 +1,156 @@
+"""
+Cross-process cache invalidation bus over Postgres LISTEN/NOTIFY
+Writers call `invalidate` inside their transaction: pg_notify is transactional,
+so workers only hear about committed writes. Each worker runs one listener
+thread that evicts matching cache entries, and flushes everything after a
+reconnect (notifications sent while disconnected are lost). Other services
+register their own channels on the same listener (see event_fanout.py).
+"""
+import logging
+import select
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import listen_engine
+from . import cache
+from .after_commit import run_after_commit
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY payloads are limited to 8000 bytes
+MAX_PAYLOAD_BYTES = 7000
+
+# DBAPI drivers the listener thread can LISTEN with
+LISTEN_DRIVERS = ("psycopg2", "psycopg")
+
+
+def _payloads(namespace: str, keys: Iterable[str]):
+    chunk = []
+    size = len(namespace) + 1
+    for key in keys:
+        if chunk and size + len(key) + 1 > MAX_PAYLOAD_BYTES:
+            yield f"{namespace}:{','.join(chunk)}"
+            chunk, size = [], len(namespace) + 1
+        chunk.append(key)
+        size += len(key) + 1
+    if chunk:
+        yield f"{namespace}:{','.join(chunk)}"
+
+
+def notify(db: Session, channel: str, payloads: List[str]) -> None:
+    """pg_notify every payload in the caller's transaction, in one statement."""
+    if payloads:
+        db.execute(text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+                   {"channel": channel, "payloads": payloads})
+
+
+def invalidate(db: Session, namespace: str, keys: Iterable = (cache.ALL_KEYS,)) -> None:
+    """Invalidate cache keys on every worker once the current transaction commits."""
+    keys = sorted({str(key) for key in keys})
+    if not keys:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        notify(db, settings.CACHE_INVALIDATION_CHANNEL, list(_payloads(namespace, keys)))
+    # Evict locally right after commit too, without waiting for the round trip
+    run_after_commit(db, lambda: [cache.evict(namespace, key) for key in keys])
+
+
+def _apply(payload: str) -> None:
+    namespace, _, keys = payload.partition(":")
+    for key in keys.split(","):
+        cache.evict(namespace, key)
+
+
+class NotificationListener:
+    """
+    Background LISTEN loop (psycopg2 or psycopg 3.2+) shared by every
+    LISTEN/NOTIFY channel. Reconnects with backoff and runs each channel's
+    `on_reconnect` afterwards.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, Callable[[str], None]] = {}
+        self._reconnect_hooks: List[Callable[[], None]] = []
+        self._thread = None
+
+    @property
+    def supported(self) -> bool:
+        """Whether this worker (and so every worker, same config) can LISTEN."""
+        return listen_engine.dialect.name == "postgresql" and listen_engine.dialect.driver in LISTEN_DRIVERS
+
+    def register(self, channel: str, handler: Callable[[str], None],
+                 on_reconnect: Optional[Callable[[], None]] = None) -> None:
+        """Call `handler(payload)` for every notification on `channel`. Register before start()."""
+        self._handlers[channel] = handler
+        if on_reconnect is not None:
+            self._reconnect_hooks.append(on_reconnect)
+
+    def start(self):
+        if not self.supported:
+            if listen_engine.dialect.name == "postgresql":
+                # Multi-worker deployments serve stale cache entries and miss SSE events without it
+                logger.error(f"LISTEN/NOTIFY is not supported with the {listen_engine.dialect.driver} driver "
+                             f"(use psycopg2 or psycopg): cross-worker cache invalidation and SSE fan-out "
+                             f"are disabled, caches rely on TTLs only")
+            return
+        self._thread = threading.Thread(target=self._run, name="notification-listener", daemon=True)
+        self._thread.start()
+
+    def _lost(self):
+        for hook in self._reconnect_hooks:
+            try:
+                hook()
+            except Exception:
+                logger.exception("Notification listener reconnect hook failed")
+
+    @staticmethod
+    def _notifications(driver_connection):
+        """Yield notifications until the connection fails (both drivers expose .channel / .payload)."""
+        if listen_engine.dialect.driver == "psycopg":
+            while True:
+                # Returns every 30s even when idle, like the select() timeout below
+                yield from driver_connection.notifies(timeout=30)
+        while True:
+            if select.select([driver_connection], [], [], 30) == ([], [], []):
+                continue
+            driver_connection.poll()
+            while driver_connection.notifies:
+                yield driver_connection.notifies.pop(0)
+
+    def _run(self):
+        backoff = 1
+        while True:
+            connection = None
+            try:
+                connection = listen_engine.raw_connection()
+                driver_connection = connection.driver_connection
+                driver_connection.autocommit = True
+                with driver_connection.cursor() as cursor:
+                    for channel in self._handlers:
+                        cursor.execute(f'LISTEN "{channel}"')
+                # Anything published while we were not listening is lost
+                self._lost()
+                backoff = 1
+                for notification in self._notifications(driver_connection):
+                    try:
+                        self._handlers[notification.channel](notification.payload)
+                    except Exception:
+                        logger.exception(f"Bad notification on {notification.channel}: {notification.payload[:200]}")
+            except Exception:
+                logger.exception("Notification listener lost its connection")
+                self._lost()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.invalidate()
+                    except Exception:
+                        pass
+
+
+listener = NotificationListener()
+listener.register(settings.CACHE_INVALIDATION_CHANNEL, _apply, on_reconnect=cache.flush_all)
@@ -0,0 +1,180 @@
+"""
+Inventory ledger
+Every Product.stock change appends an InventoryMovement in the same
+transaction. A product's stock must always equal its last snapshot plus the
+deltas recorded after it, so reconciliation replays only the movements since
+each product's snapshot, in one grouped query over the whole catalog.
+
+Ordering guarantee the replay relies on: stock-changing movements are written
+while the product row is locked (record_movements flushes the stock change
+first), so for each product their ids increase in commit order.
+"""
+import logging
+from datetime import datetime
+from typing import Iterable, List, Optional
+from sqlalchemy import and_, case, exists, func, insert, literal, select
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models.inventory import InventoryMovement, InventorySnapshot
+from ..models.product import Product
+from .sales_rollup import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+RESERVATION = "reservation"
+RESTOCK = "restock"
+DAMAGE_LOSS = "damage_loss"
+MANUAL_ADJUSTMENT = "manual_adjustment"
+
+# Snapshot rows per upsert statement (keeps SQLite under its bind-parameter limit)
+SNAPSHOT_CHUNK_SIZE = 1000
+
+
+def movement(product_id, kind: str, delta: int, quantity: Optional[int] = None, order_id=None,
+             note: Optional[str] = None) -> dict:
+    return {
+        "product_id": product_id,
+        "kind": kind,
+        "delta": delta,
+        "quantity": abs(delta) if quantity is None else quantity,
+        "order_id": order_id,
+        "note": note,
+    }
+
+
+def record_movements(db: Session, movements: Iterable[dict]) -> None:
+    """Append movements in the caller's transaction, after flushing the stock changes they describe."""
+    rows = list(movements)
+    if not rows:
+        return
+    db.flush()
+    db.execute(insert(InventoryMovement), rows)
+
+
+def load_movements(db: Session, product_id, limit: int = 100) -> List[InventoryMovement]:
+    return db.query(InventoryMovement).filter(InventoryMovement.product_id == product_id).order_by(
+        InventoryMovement.id.desc()
+    ).limit(limit).all()
+
+
+def baseline_inventory(db: Session) -> int:
+    """
+    Snapshot every product that has no snapshot yet at its current stock,
+    positioned after its latest stock-changing movement. Runs at startup, so
+    products that predate the ledger are checked from the stock they had when
+    it was deployed rather than from zero once they start selling. One
+    INSERT ... SELECT: stock and movement position come from the same statement
+    snapshot, and concurrent runs skip rows another worker already inserted.
+    """
+    last_movement = select(func.max(InventoryMovement.id)).where(
+        InventoryMovement.product_id == Product.id, InventoryMovement.delta != 0
+    ).scalar_subquery()
+    missing = select(
+        Product.id, Product.stock, func.coalesce(last_movement, 0), literal(datetime.utcnow())
+    ).where(~exists().where(InventorySnapshot.product_id == Product.id))
+    stmt = dialect_insert(db, InventorySnapshot).from_select(
+        ["product_id", "stock", "movement_id", "taken_at"], missing
+    ).on_conflict_do_nothing(index_elements=["product_id"])
+    return db.execute(stmt).rowcount
+
+
+def run_inventory_baseline_once() -> int:
+    """Baseline products without a snapshot; called once at application startup."""
+    db = SessionLocal()
+    try:
+        baselined = baseline_inventory(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    if baselined:
+        logger.info(f"Inventory ledger: baselined {baselined} products at their current stock")
+    return baselined
+
+
+def reconcile_inventory(db: Session, advance_snapshots: bool = True) -> dict:
+    """
+    Compare every product's stock with snapshot + movements since the snapshot.
+    Matching products get their snapshot moved forward (when `advance_snapshots`);
+    mismatching ones keep theirs, so the drift stays visible until investigated.
+    Products without a snapshot are normally baselined at startup (baseline_inventory);
+    one still missing with no movements is baselined here at its current stock.
+    """
+    since = func.coalesce(InventorySnapshot.movement_id, 0)
+    rows = db.execute(
+        select(
+            Product.id, Product.name, Product.stock,
+            InventorySnapshot.stock.label("snapshot_stock"),
+            InventorySnapshot.movement_id.label("snapshot_movement_id"),
+            func.coalesce(func.sum(InventoryMovement.delta), 0).label("replayed"),
+            func.count(InventoryMovement.id).label("movements"),
+            # Zero-delta movements (damage_loss) are written without the product lock
+            func.max(case((InventoryMovement.delta != 0, InventoryMovement.id))).label("last_movement_id"),
+        )
+        .outerjoin(InventorySnapshot, InventorySnapshot.product_id == Product.id)
+        .outerjoin(InventoryMovement, and_(InventoryMovement.product_id == Product.id, InventoryMovement.id > since))
+        .group_by(Product.id, Product.name, Product.stock, InventorySnapshot.stock, InventorySnapshot.movement_id)
+    ).all()
+
+    mismatches, snapshots, baselined = [], [], 0
+    for row in rows:
+        if row.snapshot_stock is None and row.movements == 0:
+            baselined += 1
+            expected = row.stock
+        else:
+            expected = (row.snapshot_stock or 0) + row.replayed
+        if expected != row.stock:
+            mismatches.append({
+                "product_id": row.id,
+                "name": row.name,
+                "stock": row.stock,
+                "expected": expected,
+                "difference": row.stock - expected,
+                "snapshot_stock": row.snapshot_stock,
+                "movements_since_snapshot": row.movements,
+            })
+            continue
+        if row.snapshot_stock is None or row.movements:
+            snapshots.append({
+                "product_id": row.id,
+                "stock": row.stock,
+                "movement_id": row.last_movement_id or row.snapshot_movement_id or 0,
+            })
+
+    if advance_snapshots:
+        for start in range(0, len(snapshots), SNAPSHOT_CHUNK_SIZE):
+            stmt = dialect_insert(db, InventorySnapshot).values(snapshots[start:start + SNAPSHOT_CHUNK_SIZE])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["product_id"],
+                set_={"stock": stmt.excluded.stock, "movement_id": stmt.excluded.movement_id,
+                      "taken_at": datetime.utcnow()},
+            ))
+
+    return {
+        "products": len(rows),
+        "mismatches": mismatches,
+        "snapshots_advanced": len(snapshots) if advance_snapshots else 0,
+        "baselined": baselined,
+    }
+
+
+def run_inventory_reconciliation_once() -> dict:
+    """Reconcile the whole catalog and advance snapshots. Runs on the background scheduler."""
+    db = SessionLocal()
+    try:
+        report = reconcile_inventory(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    for mismatch in report["mismatches"]:
+        logger.warning(f"Inventory mismatch: {mismatch}")
+    return {key: len(value) if isinstance(value, list) else value for key, value in report.items()}
+
+
+if __name__ == "__main__":
+    print(run_inventory_reconciliation_once())
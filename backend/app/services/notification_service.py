@@ -3,6 +3,7 @@ Mock notification service for WhatsApp messages
 Simulates sending notifications without external APIs
 """
 import logging
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -57,3 +58,19 @@ def notify_order_status_update(phone_number: str, order_id: int, status: str):
     }
     message = status_messages.get(status, f"Order #{order_id} status updated to: {status}")
     send_whatsapp_notification(phone_number, message)
+
+
+def notify_low_stock(product_name: str, stock: int, threshold: int, phone_number: Optional[str] = None):
+    """Alert the warehouse that a product dropped below its reorder threshold"""
+    message = f"Low stock: {product_name} has {stock} units left (reorder threshold {threshold})."
+    logger.warning(message)
+    if phone_number:
+        send_whatsapp_notification(phone_number, message)
+
+
+def notify_stock_recovered(product_name: str, stock: int, threshold: int, phone_number: Optional[str] = None):
+    """Tell the warehouse that a product is back at or above its reorder threshold"""
+    message = f"Stock recovered: {product_name} is back to {stock} units (reorder threshold {threshold})."
+    logger.info(message)
+    if phone_number:
+        send_whatsapp_notification(phone_number, message)
@@ -0,0 +1,115 @@
+"""
+Order archival service
+Moves terminal (delivered / cancelled) orders out of the hot tables into
+month-partitioned archive tables so active-order queries stay small
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, insert, delete, text
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models.order import Order, OrderItem
+from ..models.archive import ArchivedOrder, ArchivedOrderItem
+from .order_feed import prune_order_events
+
+TERMINAL_STATUSES = ("delivered", "cancelled")
+
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _next_month(value: datetime) -> datetime:
+    return datetime(value.year + 1, 1, 1) if value.month == 12 else datetime(value.year, value.month + 1, 1)
+
+
+def ensure_archive_partitions(db: Session, months) -> None:
+    """
+    Create the monthly archive partitions covering the given month starts.
+    No-op on databases without declarative partitioning (e.g. SQLite in local tooling).
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for start in sorted(set(months)):
+        end = _next_month(start)
+        suffix = start.strftime("%Y_%m")
+        for table in (ArchivedOrder.__tablename__, ArchivedOrderItem.__tablename__):
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {table}_{suffix} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+            ))
+
+
+def archive_terminal_orders(db: Session, older_than_days: Optional[int] = None, batch_size: Optional[int] = None) -> int:
+    """
+    Archive one batch of terminal orders older than the cutoff.
+    Rows are copied and deleted in a single transaction; SKIP LOCKED lets
+    several workers run the archiver without blocking each other or live writes.
+
+    Returns:
+        Number of orders archived in this batch
+    """
+    older_than_days = settings.ORDER_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+
+    batch = db.execute(
+        select(Order.id, Order.created_at)
+        .where(Order.status.in_(TERMINAL_STATUSES), Order.created_at < cutoff)
+        .order_by(Order.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not batch:
+        db.rollback()
+        return 0
+
+    order_ids = [row.id for row in batch]
+    ensure_archive_partitions(db, (_month_start(row.created_at) for row in batch))
+
+    db.execute(insert(ArchivedOrder).from_select(
+        ["id", "created_at", "readable_id", "user_id", "total", "status"],
+        select(Order.id, Order.created_at, Order.readable_id, Order.user_id, Order.total, Order.status)
+        .where(Order.id.in_(order_ids))
+    ))
+    db.execute(insert(ArchivedOrderItem).from_select(
+        ["id", "order_created_at", "order_id", "product_id", "quantity", "price", "status", "cancel_reason"],
+        select(OrderItem.id, Order.created_at, OrderItem.order_id, OrderItem.product_id,
+               OrderItem.quantity, OrderItem.price, OrderItem.status, OrderItem.cancel_reason)
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(OrderItem.order_id.in_(order_ids))
+    ))
+    db.execute(delete(OrderItem).where(OrderItem.order_id.in_(order_ids)))
+    db.execute(delete(Order).where(Order.id.in_(order_ids)))
+    db.commit()
+    return len(order_ids)
+
+
+def archive_all_terminal_orders(db: Session, older_than_days: Optional[int] = None) -> int:
+    """Run archive batches until nothing eligible is left. Returns total archived."""
+    total = 0
+    while True:
+        archived = archive_terminal_orders(db, older_than_days)
+        if not archived:
+            return total
+        total += archived
+
+
+def run_archiver_once() -> dict:
+    """Archive every eligible terminal order and prune old feed events. Runs on the background scheduler."""
+    db = SessionLocal()
+    try:
+        archived = archive_all_terminal_orders(db)
+        pruned = prune_order_events(db, settings.ORDER_EVENT_RETENTION_DAYS)
+        db.commit()
+        return {"archived": archived, "pruned_events": pruned}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print(run_archiver_once())
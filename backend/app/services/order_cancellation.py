@@ -0,0 +1,112 @@
+"""
+Set-based order cancellation
+Cancels any number of orders with a fixed number of statements: one
+UPDATE products ... FROM (aggregated non-cancelled items) for the restock,
+one UPDATE of the item rows and one of the order rows, each RETURNING what the
+rollups, watchlist, feed and cache invalidation need. Callers lock and
+validate the orders first and commit afterwards.
+"""
+from collections import defaultdict
+from typing import Iterable, List, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from ..models.order import Order, OrderItem
+from ..models.product import Product
+from .cache import PRODUCTS, DASHBOARD
+from .catalog_feed import publish_product_changes
+from .invalidation import invalidate
+from .inventory_ledger import record_movements, movement, RESTOCK
+from .order_feed import record_order_events, EVENT_CANCELLED
+from .sales_rollup import record_sales, CANCEL, ORDER_CANCELLED
+from .stock_watch import refresh_low_stock
+
+TERMINAL_STATUSES = ("delivered", "cancelled")
+
+# Bulk UPDATEs bypass the identity map; the session expires everything on commit
+_NO_SYNC = {"synchronize_session": False}
+
+
+def lock_cancellable_orders(db: Session, order_ids: Iterable, skip_locked: bool = False) -> List[Order]:
+    """
+    Lock the given orders that are not yet in a terminal state, in id order so
+    concurrent bulk cancellations never deadlock on each other.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return []
+    return db.query(Order).filter(
+        Order.id.in_(order_ids),
+        Order.status.notin_(TERMINAL_STATUSES)
+    ).order_by(Order.id).with_for_update(skip_locked=skip_locked).all()
+
+
+def cancel_orders(db: Session, order_ids: Iterable, event_data: Optional[dict] = None) -> list:
+    """
+    Cancel the given locked, non-terminal orders in the caller's transaction.
+    Restocks every non-cancelled item (cancel_reason "order_cancelled"); items
+    already cancelled as damaged stay unrestocked. Returns the cancelled order rows.
+    `event_data` is attached to the order feed events (e.g. why the system cancelled).
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return []
+
+    # 1. Restock: aggregate the still-live quantities per product, apply in one UPDATE
+    restock = select(
+        OrderItem.product_id, func.sum(OrderItem.quantity).label("quantity")
+    ).where(
+        OrderItem.order_id.in_(order_ids), OrderItem.status != "cancelled"
+    ).group_by(OrderItem.product_id).subquery()
+    restocked = db.execute(
+        update(Product)
+        .where(Product.id == restock.c.product_id)
+        .values(stock=Product.stock + restock.c.quantity)
+        .returning(Product.id, Product.sku, Product.name, Product.price, Product.stock,
+                   Product.status, Product.category, Product.reorder_threshold),
+        execution_options=_NO_SYNC
+    ).all()
+
+    # 2. Items follow the order; RETURNING gives the lines to reverse in the rollups
+    cancelled_items = db.execute(
+        update(OrderItem)
+        .where(OrderItem.order_id.in_(order_ids), OrderItem.status != "cancelled")
+        .values(status="cancelled", cancel_reason=ORDER_CANCELLED)
+        .returning(OrderItem.order_id, OrderItem.product_id, OrderItem.quantity, OrderItem.price),
+        execution_options=_NO_SYNC
+    ).all()
+
+    # 3. Orders
+    cancelled_orders = db.execute(
+        update(Order)
+        .where(Order.id.in_(order_ids))
+        .values(status="cancelled")
+        .returning(Order.id, Order.readable_id, Order.user_id, Order.status, Order.total, Order.created_at),
+        execution_options=_NO_SYNC
+    ).all()
+
+    # Rollups are per day, so orders placed on the same day share one upsert
+    categories = {product.id: product.category for product in restocked}
+    order_day = {order.id: order.created_at for order in cancelled_orders}
+    lines_by_day = defaultdict(list)
+    for item in cancelled_items:
+        created_at = order_day[item.order_id]
+        lines_by_day[created_at.date()].append(
+            (created_at, (item.product_id, categories.get(item.product_id), item.quantity, item.price))
+        )
+    for entries in lines_by_day.values():
+        record_sales(db, entries[0][0], [line for _, line in entries], CANCEL)
+
+    # Ledger rows per order and product, matching the quantities the restock UPDATE added back
+    restocked_units = defaultdict(int)
+    for item in cancelled_items:
+        restocked_units[(item.order_id, item.product_id)] += item.quantity
+    record_movements(db, [
+        movement(product_id, RESTOCK, quantity, order_id=order_id)
+        for (order_id, product_id), quantity in restocked_units.items()
+    ])
+    refresh_low_stock(db, restocked)
+    publish_product_changes(db, restocked)
+    record_order_events(db, cancelled_orders, EVENT_CANCELLED, event_data)
+    invalidate(db, PRODUCTS, [product.id for product in restocked])
+    invalidate(db, DASHBOARD)
+    return cancelled_orders
@@ -0,0 +1,55 @@
+"""
+Stale order expiry
+Pending orders hold their stock from the moment they are placed. Orders left
+pending longer than ORDER_PENDING_EXPIRY_MINUTES are cancelled with restock,
+in batches claimed with FOR UPDATE SKIP LOCKED so every worker's scheduler can
+run the job without double-cancelling or blocking on each other.
+"""
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models.order import Order
+from .order_cancellation import cancel_orders
+
+logger = logging.getLogger(__name__)
+
+EXPIRED = "expired"
+
+
+def expire_stale_orders(db: Session, older_than: datetime, batch_size: int) -> int:
+    """Cancel one batch of pending orders created before `older_than`. Returns orders cancelled."""
+    batch = [
+        row.id for row in
+        db.query(Order.id).filter(Order.status == "pending", Order.created_at < older_than)
+        .order_by(Order.created_at).limit(batch_size).with_for_update(skip_locked=True)
+    ]
+    return len(cancel_orders(db, batch, {"reason": EXPIRED}))
+
+
+def run_order_expiry_once() -> dict:
+    """Expire every stale pending order, committing batch by batch."""
+    older_than = datetime.utcnow() - timedelta(minutes=settings.ORDER_PENDING_EXPIRY_MINUTES)
+    expired, batches = 0, 0
+    db = SessionLocal()
+    try:
+        while True:
+            count = expire_stale_orders(db, older_than, settings.ORDER_EXPIRY_BATCH_SIZE)
+            db.commit()
+            if not count:
+                break
+            expired += count
+            batches += 1
+            if count < settings.ORDER_EXPIRY_BATCH_SIZE:
+                break
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return {"expired": expired, "batches": batches}
+
+
+if __name__ == "__main__":
+    print(run_order_expiry_once())
@@ -0,0 +1,109 @@
+"""
+Order change feed
+Handlers in routers/orders.py record an OrderEvent in the same transaction as
+the change; after commit the event is pushed to live admin subscribers on every worker. The
+table doubles as the catch-up log for reconnecting clients.
+
+Event ids are allocated at insert but become visible at commit, so they are
+not commit-ordered: an event can commit after one with a higher id was already
+served. Catch-up therefore re-scans a grace window below the cursor, and
+clients drop event ids they have already seen.
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models.order_event import OrderEvent
+from .event_fanout import broadcast
+from .event_stream import order_events
+
+EVENT_CREATED = "created"
+EVENT_STATUS_CHANGED = "status_changed"
+EVENT_CANCELLED = "cancelled"
+EVENT_ITEMS_CANCELLED = "items_cancelled"
+
+MAX_CHANGES_PAGE = 1000
+
+
+def serialize_event(event: OrderEvent) -> dict:
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "order_id": str(event.order_id),
+        "readable_id": event.readable_id,
+        "user_id": str(event.user_id) if event.user_id else None,
+        "status": event.status,
+        "total": event.total,
+        "data": event.data or {},
+        "created_at": event.created_at.isoformat() if event.created_at else None,
+    }
+
+
+def record_order_event(db: Session, order, event_type: str, data: Optional[dict] = None) -> OrderEvent:
+    """Append an order event in the caller's transaction and push it live after commit."""
+    event = OrderEvent(
+        order_id=order.id,
+        readable_id=order.readable_id,
+        user_id=order.user_id,
+        event_type=event_type,
+        status=order.status,
+        total=order.total,
+        data=data,
+    )
+    db.add(event)
+    db.flush()
+    payload = serialize_event(event)
+    broadcast(db, order_events, [(event_type, payload, str(payload["id"]))])
+    return event
+
+
+def record_order_events(db: Session, orders: Iterable, event_type: str, data: Optional[dict] = None) -> list:
+    """
+    record_order_event for many orders in one multi-row INSERT ... RETURNING.
+    `orders` only needs id, readable_id, user_id, status and total attributes.
+    """
+    rows = [
+        {
+            "order_id": order.id,
+            "readable_id": order.readable_id,
+            "user_id": order.user_id,
+            "event_type": event_type,
+            "status": order.status,
+            "total": order.total,
+            "data": data,
+        }
+        for order in orders
+    ]
+    if not rows:
+        return []
+    events = db.execute(insert(OrderEvent).values(rows).returning(*OrderEvent.__table__.c)).all()
+    # RETURNING order is not guaranteed; the feed is ordered by id
+    payloads = sorted((serialize_event(event) for event in events), key=lambda payload: payload["id"])
+    broadcast(db, order_events, [(event_type, payload, str(payload["id"])) for payload in payloads])
+    return events
+
+
+def load_changes_since(db: Session, since: int, limit: int = MAX_CHANGES_PAGE) -> List[dict]:
+    """
+    Events with id > since (at most `limit`), oldest first, preceded by the
+    events at or below the cursor created within ORDER_FEED_GRACE_SECONDS of
+    the cursor event (already-served ids included; callers page on id > since).
+    """
+    rescanned = []
+    if since and settings.ORDER_FEED_GRACE_SECONDS > 0:
+        cursor_time = db.query(OrderEvent.created_at).filter(OrderEvent.id == since).scalar()
+        if cursor_time is not None:
+            # Nearest the cursor first, so a capped window keeps the likeliest late commits
+            rescanned = db.query(OrderEvent).filter(
+                OrderEvent.id <= since,
+                OrderEvent.created_at >= cursor_time - timedelta(seconds=settings.ORDER_FEED_GRACE_SECONDS)
+            ).order_by(OrderEvent.id.desc()).limit(MAX_CHANGES_PAGE).all()[::-1]
+    rows = db.query(OrderEvent).filter(OrderEvent.id > since).order_by(OrderEvent.id).limit(limit).all()
+    return [serialize_event(row) for row in rescanned + rows]
+
+
+def prune_order_events(db: Session, retention_days: int) -> int:
+    """Drop feed history older than the retention window. Returns rows deleted."""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    return db.execute(delete(OrderEvent).where(OrderEvent.created_at < cutoff)).rowcount
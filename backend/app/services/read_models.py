@@ -0,0 +1,135 @@
+"""
+Column-level read queries for list endpoints
+Selects only what the caller asked for instead of loading full ORM graphs.
+Rows are plain dicts shaped like the response schemas, so the list endpoints
+can serialize them directly without ORM identity mapping or Pydantic validation.
+"""
+from typing import Dict, Iterator, List, Optional
+from uuid import UUID
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session
+from ..models.archive import ArchivedOrder, ArchivedOrderItem
+from ..models.order import Order, OrderItem
+from ..models.product import Product
+from ..models.user import User
+from ..schemas.product import AdminProductResponse, ProductResponse
+from ..schemas.order import OrderResponse
+from .statements import product_page_statement
+
+PRODUCT_FIELDS = tuple(ProductResponse.model_fields)
+ADMIN_PRODUCT_FIELDS = tuple(AdminProductResponse.model_fields)
+
+ORDER_COLUMN_FIELDS = ("id", "readable_id", "user_id", "total", "status", "created_at")
+# Item columns carried on the joined order rows, as (row label, item attribute)
+ITEM_COLUMNS = (("_item_id", "id"), ("_product_id", "product_id"), ("_quantity", "quantity"),
+                ("_price", "price"), ("_item_status", "status"))
+# Schema order, so full rows serialize with the same key order as OrderResponse
+ORDER_FIELDS = tuple(OrderResponse.model_fields)
+
+
+def select_product_fields(db: Session, fields: List[str], active_only: bool, skip: int, limit: int) -> List[Dict]:
+    """Return product rows containing only the requested columns."""
+    stmt = product_page_statement(tuple(fields), active_only)
+    rows = db.execute(stmt, {"skip": skip, "limit": limit}).all()
+    return [row._asdict() for row in rows]
+
+
+def all_orders(columns=ORDER_COLUMN_FIELDS):
+    """Live and archived orders as one selectable (UNION ALL; an order lives in exactly one of them)."""
+    return union_all(
+        select(*[getattr(Order, name) for name in columns]),
+        select(*[getattr(ArchivedOrder, name) for name in columns]),
+    ).subquery("all_orders")
+
+
+def select_order_summaries(db: Session, user_id: Optional[UUID] = None):
+    """Summary rows read from the order tables alone (no item or product join), archive included."""
+    orders = all_orders()
+    stmt = select(orders.c.id, orders.c.readable_id, orders.c.total, orders.c.status, orders.c.created_at)
+    if user_id is not None:
+        stmt = stmt.where(orders.c.user_id == user_id)
+    return db.execute(stmt.order_by(orders.c.created_at.desc())).all()
+
+
+def _order_field_rows(order_model, item_model, fields: List[str], with_items: bool, user_id: Optional[UUID]):
+    """One UNION ALL branch: orders (live or archived) with their items joined in, if requested."""
+    stmt = select(
+        order_model.id.label("_order_id"),
+        order_model.created_at.label("_created_at"),
+        *[getattr(order_model, name).label(name) for name in ORDER_COLUMN_FIELDS if name in fields],
+    )
+    if "customer_phone" in fields:
+        stmt = stmt.add_columns(User.phone.label("customer_phone")).outerjoin(User, User.id == order_model.user_id)
+    if with_items:
+        stmt = stmt.add_columns(*[getattr(item_model, name).label(label) for label, name in ITEM_COLUMNS]) \
+            .outerjoin(item_model, item_model.order_id == order_model.id)
+        if "items" in fields:
+            stmt = stmt.add_columns(Product.name.label("_product_name")).outerjoin(
+                Product, Product.id == item_model.product_id
+            )
+    if user_id is not None:
+        stmt = stmt.where(order_model.user_id == user_id)
+    return stmt
+
+
+def _finish_order(data: Dict, fields: List[str]) -> Dict:
+    totals = data.pop("_totals", None)
+    if totals is not None:
+        # Same arithmetic as calculate_order_totals so results are identical
+        total_original, total_fulfilled = totals
+        data["total_fulfilled"] = total_fulfilled
+        data["total_refundable"] = max(0.0, total_original - total_fulfilled)
+    return {name: data[name] for name in fields}
+
+
+def iter_order_fields(db: Session, fields: List[str], user_id: Optional[UUID] = None) -> Iterator[Dict]:
+    """
+    Yield order rows containing only the requested fields, archived orders included.
+    Items (and the product join) are only joined in when items or derived totals
+    are requested; then each order arrives as consecutive rows of one query,
+    one per item, and is yielded once its last row has been read.
+    """
+    with_items = any(name in fields for name in ("items", "total_fulfilled", "total_refundable"))
+    rows = union_all(
+        _order_field_rows(Order, OrderItem, fields, with_items, user_id),
+        _order_field_rows(ArchivedOrder, ArchivedOrderItem, fields, with_items, user_id),
+    ).subquery("order_rows")
+    # Order id breaks created_at ties, so an order's rows stay together
+    stmt = select(rows).order_by(rows.c._created_at.desc(), rows.c._order_id)
+
+    data = None
+    current_id = None
+    for row in db.execute(stmt):
+        if row._order_id != current_id:
+            if data is not None:
+                yield _finish_order(data, fields)
+            current_id = row._order_id
+            data = {name: getattr(row, name) for name in fields if name in ORDER_COLUMN_FIELDS or name == "customer_phone"}
+            if with_items:
+                # [original, fulfilled]
+                data["_totals"] = [0.0, 0.0]
+                if "items" in fields:
+                    data["items"] = []
+        if not with_items or row._item_id is None:
+            continue
+        item_total = row._price * row._quantity
+        data["_totals"][0] += item_total
+        if row._item_status != "cancelled":
+            data["_totals"][1] += item_total
+        if "items" in fields:
+            data["items"].append({
+                "id": row._item_id,
+                "product_id": row._product_id,
+                "quantity": row._quantity,
+                "price": row._price,
+                "product_name": row._product_name or "Unknown Product",
+                "status": row._item_status,
+            })
+    if data is not None:
+        yield _finish_order(data, fields)
+
+
+def select_order_fields(db: Session, fields: List[str], user_id: Optional[UUID] = None) -> List[Dict]:
+    """iter_order_fields as a list."""
+    return list(iter_order_fields(db, fields, user_id))
+
@@ -0,0 +1,232 @@
+"""
+Daily sales rollups
+Keeps sales_daily_product up to date from order events so analytics never
+have to scan raw orders; category totals are summed from it. Rows are
+attributed to the day the order was placed and keep the product's category at
+the time of the sale; `rebuild_sales_rollups` recomputes the metrics from
+order history without re-attributing existing rows.
+
+Writers and rebuilds coordinate per day with transaction-scoped advisory locks
+(Postgres): record_sales holds its day's lock shared, a rebuild holds the days
+it recomputes exclusively. Rebuilding old days never blocks order placement,
+and the full-history CLI rebuilds a chunk of days per transaction.
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import and_, case, delete, exists, func, or_, select, text, true, union_all
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models.analytics import SalesDailyProduct
+from ..models.archive import ArchivedOrder, ArchivedOrderItem
+from ..models.order import Order, OrderItem
+from ..models.product import Product
+
+# pg_advisory_xact_lock(namespace, day ordinal) keys for rollup days
+ROLLUP_LOCK_NAMESPACE = 0x5A1E
+# Days recomputed (and locked) per transaction by the CLI rebuild
+REBUILD_CHUNK_DAYS = 7
+
+UNCATEGORIZED = "uncategorized"
+# OrderItem.cancel_reason for items cancelled by a full order cancellation
+ORDER_CANCELLED = "order_cancelled"
+
+SALE = "sale"
+CANCEL = "cancel"
+REFUND = "refund"
+
+METRICS = ("units", "revenue", "cancelled_amount", "refunded_amount")
+
+# (product_id, category, quantity, unit price)
+SalesLine = Tuple[UUID, Optional[str], int, float]
+
+
+def dialect_insert(db: Session, model):
+    """INSERT supporting on_conflict_do_update on both Postgres and SQLite (local tooling)."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+
+def _lock_days(db: Session, days: Iterable[date], exclusive: bool) -> None:
+    """Take the rollup day locks until the transaction ends; no-op outside Postgres."""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    lock = "pg_advisory_xact_lock" if exclusive else "pg_advisory_xact_lock_shared"
+    # Ascending, so two rebuilds with overlapping ranges never deadlock
+    db.execute(
+        text(f"SELECT {lock}(:namespace, day) FROM unnest(CAST(:days AS int[])) AS day ORDER BY day"),
+        {"namespace": ROLLUP_LOCK_NAMESPACE, "days": sorted({day.toordinal() for day in days})},
+    )
+
+
+def _upsert(db: Session, model, key_columns, rows):
+    if not rows:
+        return
+    stmt = dialect_insert(db, model).values(rows)
+    table = model.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={name: table.c[name] + stmt.excluded[name] for name in METRICS},
+    )
+    db.execute(stmt)
+
+
+def record_sales(db: Session, order_created_at: datetime, lines: Iterable[SalesLine], kind: str) -> None:
+    """
+    Apply one order event to the rollups in the caller's transaction.
+    Args:
+        order_created_at: Creation time of the order (selects the rollup day)
+        lines: (product_id, category, quantity, price) for every affected item
+        kind: SALE on creation, CANCEL for full cancellation, REFUND for item cancellation
+    """
+    day = order_created_at.date()
+    per_product = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+    categories = {}
+
+    for product_id, category, quantity, price in lines:
+        # Only used when the row is created: an existing row keeps its sale-time category
+        categories[product_id] = category or UNCATEGORIZED
+        amount = quantity * price
+        bucket = per_product[product_id]
+        if kind == SALE:
+            bucket["units"] += quantity
+            bucket["revenue"] += amount
+        elif kind == CANCEL:
+            bucket["cancelled_amount"] += amount
+        elif kind == REFUND:
+            bucket["refunded_amount"] += amount
+        else:
+            raise ValueError(f"Unknown sales event kind: {kind}")
+
+    _lock_days(db, [day], exclusive=False)
+    _upsert(db, SalesDailyProduct, ["day", "product_id"], [
+        {"day": day, "product_id": product_id, "category": categories[product_id], **metrics}
+        # Sorted so concurrent orders touch rollup rows in the same order (no deadlocks)
+        for product_id, metrics in sorted(per_product.items(), key=lambda pair: str(pair[0]))
+    ])
+
+
+def _item_facts(order_model, item_model, start: Optional[date], end: Optional[date]):
+    amount = item_model.quantity * item_model.price
+    cancelled_by_order = or_(
+        item_model.cancel_reason == ORDER_CANCELLED,
+        # Items cancelled before cancel_reason was recorded
+        and_(item_model.cancel_reason.is_(None), order_model.status == "cancelled"),
+    )
+    stmt = (
+        select(
+            func.date(order_model.created_at).label("day"),
+            item_model.product_id.label("product_id"),
+            func.coalesce(Product.category, UNCATEGORIZED).label("category"),
+            item_model.quantity.label("units"),
+            amount.label("revenue"),
+            case((and_(item_model.status == "cancelled", cancelled_by_order), amount), else_=0.0).label("cancelled_amount"),
+            case((and_(item_model.status == "cancelled", ~cancelled_by_order), amount), else_=0.0).label("refunded_amount"),
+        )
+        .join(order_model, order_model.id == item_model.order_id)
+        .outerjoin(Product, Product.id == item_model.product_id)
+    )
+    if start:
+        stmt = stmt.where(order_model.created_at >= datetime.combine(start, datetime.min.time()))
+    if end:
+        stmt = stmt.where(order_model.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return stmt
+
+
+def _history_bounds(db: Session) -> Optional[Tuple[date, date]]:
+    """First and last day holding any order (live or archived) or rollup row, None when there are none."""
+    days = []
+    for column in (Order.created_at, ArchivedOrder.created_at, SalesDailyProduct.day):
+        first, last = db.execute(select(func.min(column), func.max(column))).one()
+        days += [value.date() if isinstance(value, datetime) else value for value in (first, last) if value is not None]
+    return (min(days), max(days)) if days else None
+
+
+def rebuild_sales_rollups(db: Session, start: date, end: date) -> None:
+    """
+    Recompute the rollups for [start, end] (inclusive) from live and archived orders.
+    Existing rows get their metrics overwritten but keep their category, so a
+    product moved to another category since the sale is attributed the same
+    way as by record_sales. Rows for new (day, product) pairs take the
+    product's current category, the best information left.
+
+    Safe to run while orders are being placed: the days in range are locked
+    (see _lock_days) until the caller commits. The recount then sees every
+    transaction that already wrote to them, and record_sales calls for those
+    days that arrive meanwhile wait and apply on top of it. Keep ranges short:
+    orders placed on a locked day wait for the whole rebuild.
+    """
+    _lock_days(db, [start + timedelta(days=offset) for offset in range((end - start).days + 1)], exclusive=True)
+    facts = union_all(
+        _item_facts(Order, OrderItem, start, end),
+        _item_facts(ArchivedOrder, ArchivedOrderItem, start, end),
+    ).subquery()
+    sums = [func.sum(facts.c[name]) for name in METRICS]
+
+    # WHERE true: SQLite needs it to parse INSERT ... SELECT ... ON CONFLICT
+    stmt = dialect_insert(db, SalesDailyProduct).from_select(
+        ["day", "product_id", "category", *METRICS],
+        select(facts.c.day, facts.c.product_id, func.max(facts.c.category), *sums)
+        .where(true())
+        .group_by(facts.c.day, facts.c.product_id)
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["day", "product_id"],
+        set_={name: stmt.excluded[name] for name in METRICS},
+    ))
+
+    # Rows in range no order backs any more (e.g. hard-deleted orders)
+    db.execute(delete(SalesDailyProduct).where(
+        SalesDailyProduct.day >= start,
+        SalesDailyProduct.day <= end,
+        ~exists().where(facts.c.day == SalesDailyProduct.day, facts.c.product_id == SalesDailyProduct.product_id),
+    ))
+
+
+def run_rollup_refresh_once() -> dict:
+    """Rebuild the most recent SALES_ROLLUP_REFRESH_DAYS days. Runs on the background scheduler."""
+    end = datetime.utcnow().date()
+    start = end - timedelta(days=settings.SALES_ROLLUP_REFRESH_DAYS - 1)
+    db = SessionLocal()
+    try:
+        rebuild_sales_rollups(db, start, end)
+        db.commit()
+        return {"days": settings.SALES_ROLLUP_REFRESH_DAYS}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild daily sales rollup tables")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="Last day (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        bounds = _history_bounds(db)
+        if bounds is None:
+            print("No orders to roll up")
+        else:
+            start, end = args.start or bounds[0], args.end or bounds[1]
+            # One transaction per chunk: orders on other days are never held up
+            while start <= end:
+                chunk_end = min(end, start + timedelta(days=REBUILD_CHUNK_DAYS - 1))
+                rebuild_sales_rollups(db, start, chunk_end)
+                db.commit()
+                start = chunk_end + timedelta(days=1)
+            print("Sales rollups rebuilt")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,125 @@
+"""
+In-process job scheduler
+One daemon thread per worker runs registered periodic jobs one at a time.
+Jobs must be safe to run concurrently from several workers (e.g. claim rows
+with FOR UPDATE SKIP LOCKED); the scheduler only handles timing and reporting.
+A job returns a dict of counts (or None), logged together with its duration.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Recent runs kept per job for GET /dashboard/jobs
+RUN_HISTORY_SIZE = 20
+
+
+class Job:
+    def __init__(self, name: str, func: Callable[[], Optional[dict]], interval_seconds: float, initial_delay: float):
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.next_run = time.monotonic() + initial_delay
+        self.runs = 0
+        self.failures = 0
+        self.history = deque(maxlen=RUN_HISTORY_SIZE)
+
+    def run(self) -> dict:
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        result, error = None, None
+        try:
+            result = self.func() or {}
+        except Exception as exc:
+            error = repr(exc)
+            logger.exception(f"Scheduled job {self.name} failed")
+        duration_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        self.runs += 1
+        if error:
+            self.failures += 1
+        else:
+            counts = ", ".join(f"{key}={value}" for key, value in result.items()) or "nothing to do"
+            logger.info(f"Scheduled job {self.name}: {counts} in {duration_ms} ms")
+        run = {"started_at": started_at, "duration_ms": duration_ms, "result": result, "error": error}
+        self.history.append(run)
+        return run
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "failures": self.failures,
+            "next_run_in_seconds": max(0.0, round(self.next_run - time.monotonic(), 1)),
+            "recent_runs": list(self.history),
+        }
+
+
+class Scheduler:
+    def __init__(self, name: str = "scheduler"):
+        self.name = name
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def add_job(self, name: str, func: Callable[[], Optional[dict]], interval_seconds: float,
+                initial_delay: Optional[float] = None) -> Optional[Job]:
+        """
+        Run `func` every `interval_seconds`, first after `initial_delay`
+        (defaults to one interval). A non-positive interval disables the job.
+        """
+        if interval_seconds <= 0:
+            return None
+        job = Job(name, func, interval_seconds, interval_seconds if initial_delay is None else initial_delay)
+        with self._lock:
+            self._jobs[name] = job
+        self._wakeup.set()
+        return job
+
+    def status(self) -> List[dict]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.status() for job in jobs]
+
+    def start(self) -> Optional[threading.Thread]:
+        if self._thread is not None or not self._jobs:
+            return self._thread
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stopping:
+            with self._lock:
+                due = min(self._jobs.values(), key=lambda job: job.next_run, default=None)
+            if due is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            delay = due.next_run - time.monotonic()
+            if delay > 0:
+                # Woken early by add_job / stop: re-evaluate which job is due
+                self._wakeup.wait(delay)
+                self._wakeup.clear()
+                continue
+            due.run()
+            # Fixed delay after each run, so a slow run never causes back-to-back catch-up runs
+            due.next_run = time.monotonic() + due.interval_seconds
+
+
+scheduler = Scheduler("background-jobs")
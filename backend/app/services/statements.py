@@ -0,0 +1,87 @@
+"""
+Pre-built statements for the hottest queries
+Each statement is constructed once at import time with bind parameters, so a
+request skips building the query and computing its cache key, and SQLAlchemy's
+compiled cache always returns the same compiled form. With the psycopg (3)
+driver the repeated SQL is also prepared server-side (see database.py).
+
+The statement-cache counters below show whether that holds in production:
+every execution is tallied by how its SQL was obtained.
+"""
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from sqlalchemy import bindparam, event, select
+from sqlalchemy.engine import default
+from sqlalchemy.orm import Session, joinedload
+from ..database import engine
+from ..models.order import Order, OrderItem
+from ..models.product import Product
+from ..models.user import User
+
+PRODUCT_FOR_UPDATE = select(Product).where(Product.id == bindparam("product_id")).with_for_update()
+
+USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+
+ORDER_WITH_ITEMS = select(Order).options(
+    joinedload(Order.items).joinedload(OrderItem.product),
+    joinedload(Order.user)
+).where(Order.id == bindparam("order_id"))
+
+
+def get_product_for_update(db: Session, product_id) -> Optional[Product]:
+    return db.execute(PRODUCT_FOR_UPDATE, {"product_id": product_id}).scalar_one_or_none()
+
+
+def get_user(db: Session, user_id) -> Optional[User]:
+    return db.execute(USER_BY_ID, {"user_id": user_id}).scalar_one_or_none()
+
+
+def get_order_with_items(db: Session, order_id, refresh: bool = False) -> Optional[Order]:
+    """Order with items, their products and the user in one round trip. `refresh` overwrites loaded state."""
+    options = {"populate_existing": True} if refresh else {}
+    return db.execute(ORDER_WITH_ITEMS, {"order_id": order_id}, execution_options=options).unique().scalar_one_or_none()
+
+
+@lru_cache(maxsize=128)
+def product_page_statement(fields: Tuple[str, ...], active_only: bool):
+    """Catalog page selecting `fields`; one statement per distinct field list."""
+    stmt = select(*[getattr(Product, name) for name in fields])
+    if active_only:
+        stmt = stmt.where(Product.status == "active")
+    return stmt.offset(bindparam("skip")).limit(bindparam("limit"))
+
+
+# Compiled-cache outcomes, tallied per execution (context.cache_hit)
+_CACHE_OUTCOMES = {
+    default.CACHE_HIT: "hits",
+    default.CACHE_MISS: "misses",
+    default.CACHING_DISABLED: "caching_disabled",
+    default.NO_CACHE_KEY: "no_cache_key",
+    default.NO_DIALECT_SUPPORT: "no_dialect_support",
+}
+_cache_counters: Dict[str, int] = dict.fromkeys(_CACHE_OUTCOMES.values(), 0)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_cache_outcome(conn, cursor, statement, parameters, context, executemany):
+    outcome = _CACHE_OUTCOMES.get(getattr(context, "cache_hit", None))
+    if outcome is not None:
+        # Unlocked increment: a lost update under thread races only skews the ratio slightly
+        _cache_counters[outcome] += 1
+
+
+def statement_cache_stats() -> dict:
+    """Per-worker compiled-cache outcomes since startup and the current cache size."""
+    lookups = _cache_counters["hits"] + _cache_counters["misses"]
+    compiled_cache = getattr(engine, "_compiled_cache", None)
+    return {
+        **_cache_counters,
+        "hit_rate": round(_cache_counters["hits"] / lookups, 4) if lookups else None,
+        "cached_statements": len(compiled_cache) if compiled_cache is not None else None,
+        "cache_capacity": getattr(compiled_cache, "capacity", None),
+    }
+
+
+def reset_statement_cache_stats() -> None:
+    for outcome in _cache_counters:
+        _cache_counters[outcome] = 0
@@ -0,0 +1,143 @@
+"""
+Low-stock watchlist
+Keeps the low_stock_watchlist table in step with product stock inside the same
+transaction as the stock change, and emits threshold-crossing events to the
+notification layer once that transaction commits.
+"""
+import logging
+from typing import Dict, Iterable, List
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models.inventory import CategoryStockThreshold, LowStockEntry
+from ..models.product import Product
+from .after_commit import run_after_commit
+from .notification_service import notify_low_stock, notify_stock_recovered
+from .sales_rollup import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+
+def load_category_thresholds(db: Session, categories: Iterable) -> Dict[str, int]:
+    categories = {category for category in categories if category}
+    if not categories:
+        return {}
+    rows = db.execute(
+        select(CategoryStockThreshold.category, CategoryStockThreshold.threshold)
+        .where(CategoryStockThreshold.category.in_(categories))
+    ).all()
+    return {row.category: row.threshold for row in rows}
+
+
+def effective_threshold(product, category_thresholds: Dict[str, int]) -> int:
+    """Product override, then category threshold, then the global default."""
+    if product.reorder_threshold is not None:
+        return product.reorder_threshold
+    return category_thresholds.get(product.category, settings.LOW_STOCK_DEFAULT_THRESHOLD)
+
+
+def refresh_low_stock(db: Session, products: Iterable) -> None:
+    """
+    Re-evaluate watchlist membership for the given products.
+    `products` only needs id, name, stock, status, category and reorder_threshold
+    attributes, so ORM objects and Core result rows both work. Call after the
+    stock change has been applied and before commit.
+    """
+    products = list({product.id: product for product in products}.values())
+    if not products:
+        return
+    thresholds = load_category_thresholds(db, (product.category for product in products))
+    entries = {
+        entry.product_id: entry
+        for entry in db.execute(
+            select(LowStockEntry.product_id, LowStockEntry.stock, LowStockEntry.threshold)
+            .where(LowStockEntry.product_id.in_([p.id for p in products]))
+        )
+    }
+
+    crossed_below, recovered = [], []
+    upserts, removed = [], []
+    for product in products:
+        threshold = effective_threshold(product, thresholds)
+        is_low = product.status == "active" and product.stock < threshold
+        entry = entries.get(product.id)
+        if is_low:
+            if entry is None:
+                crossed_below.append((product.name, product.stock, threshold))
+            elif (entry.stock, entry.threshold) == (product.stock, threshold):
+                continue
+            upserts.append({"product_id": product.id, "stock": product.stock, "threshold": threshold})
+        elif entry is not None:
+            removed.append(product.id)
+            # Deactivated products leave the set silently; only real restocks are "recovered"
+            if product.status == "active":
+                recovered.append((product.name, product.stock, threshold))
+
+    # Core statements: a concurrent transaction may insert or delete the same
+    # entries between our read and write, which ORM add/delete would turn into
+    # an IntegrityError or a stale-row error
+    if upserts:
+        stmt = dialect_insert(db, LowStockEntry).values(upserts)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["product_id"],
+            set_={"stock": stmt.excluded.stock, "threshold": stmt.excluded.threshold},
+        ))
+    if removed:
+        db.execute(delete(LowStockEntry).where(LowStockEntry.product_id.in_(removed)))
+
+    if crossed_below or recovered:
+        run_after_commit(db, lambda: _emit_crossings(crossed_below, recovered))
+
+
+def _emit_crossings(crossed_below: List[tuple], recovered: List[tuple]) -> None:
+    for name, stock, threshold in crossed_below:
+        notify_low_stock(name, stock, threshold, settings.LOW_STOCK_ALERT_PHONE)
+    for name, stock, threshold in recovered:
+        notify_stock_recovered(name, stock, threshold, settings.LOW_STOCK_ALERT_PHONE)
+
+
+def rebuild_low_stock_watchlist(db: Session) -> int:
+    """
+    Re-derive the whole watchlist from the products table (backfill, or after a
+    category threshold change). Does not emit crossing events. Returns the set size.
+    Upserts and deletes like refresh_low_stock, so it is safe to run from several
+    workers at once and alongside stock changes; existing entries keep `since`.
+    """
+    thresholds = {row.category: row.threshold for row in db.query(CategoryStockThreshold)}
+    low = []
+    for product in db.execute(
+        select(Product.id, Product.stock, Product.category, Product.reorder_threshold)
+        .where(Product.status == "active")
+    ):
+        threshold = effective_threshold(product, thresholds)
+        if product.stock < threshold:
+            low.append({"product_id": product.id, "stock": product.stock, "threshold": threshold})
+
+    if low:
+        stmt = dialect_insert(db, LowStockEntry).values(low)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["product_id"],
+            set_={"stock": stmt.excluded.stock, "threshold": stmt.excluded.threshold},
+        ))
+    db.execute(delete(LowStockEntry).where(LowStockEntry.product_id.notin_([entry["product_id"] for entry in low])))
+    return len(low)
+
+
+def run_low_stock_rebuild_once() -> int:
+    """Backfill the watchlist; called once at application startup."""
+    db = SessionLocal()
+    try:
+        size = rebuild_low_stock_watchlist(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    logger.info(f"Low-stock watchlist rebuilt: {size} products")
+    return size
+
+
+if __name__ == "__main__":
+    print(f"Low-stock watchlist rebuilt: {run_low_stock_rebuild_once()} products")
@@ -0,0 +1,30 @@
+"""
+Sparse field selection helpers
+Parses the `fields=` query parameter used by list endpoints
+"""
+from typing import Iterable, List, Optional
+from fastapi import HTTPException
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    Parse a comma separated field list and validate it against the allowed names
+    Args:
+        fields: Raw query parameter value, e.g. "id,name,price"
+        allowed: Field names the endpoint can return
+    Returns:
+        Requested field names in request order, or None when no selection was made
+    """
+    if not fields:
+        return None
+    requested = []
+    for name in fields.split(","):
+        name = name.strip()
+        if name and name not in requested:
+            requested.append(name)
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if not requested:
+        raise HTTPException(status_code=400, detail="No fields requested")
+    return requested
@@ -0,0 +1,121 @@
+"""
+Benchmark: ORM + Pydantic list serialization vs the Core + orjson fast path
+Seeds synthetic rows inside a transaction that is rolled back afterwards,
+so it is safe to point at a development database.
+
+Usage (from backend/):
+    python -m benchmarks.read_paths --products 2000 --orders 500 --items 4
+"""
+import argparse
+import random
+import time
+import uuid
+from typing import List
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, joinedload
+from app.database import engine, Base
+from app.models.user import User
+from app.models.product import Product
+from app.models.order import Order, OrderItem
+from app.routers.orders import calculate_order_totals
+from app.schemas.order import OrderResponse
+from app.schemas.product import ProductResponse
+from app.services.read_models import ORDER_FIELDS, PRODUCT_FIELDS, select_order_fields, select_product_fields
+
+
+def seed(db: Session, products: int, orders: int, items: int):
+    customer = User(name="Bench Customer", phone=f"bench-{uuid.uuid4().hex[:8]}", role="customer")
+    db.add(customer)
+    catalog = [
+        Product(sku=f"BENCH-{uuid.uuid4().hex[:10]}", name=f"Bench Product {i}", price=round(random.uniform(5, 500), 2),
+                stock=random.randint(0, 1000), status="active", category="bench")
+        for i in range(products)
+    ]
+    db.add_all(catalog)
+    db.flush()
+    for _ in range(orders):
+        order = Order(user_id=customer.id, total=0.0, status="pending")
+        db.add(order)
+        db.flush()
+        for product in random.sample(catalog, min(items, len(catalog))):
+            db.add(OrderItem(order_id=order.id, product_id=product.id, quantity=2, price=product.price,
+                             status=random.choice(["active", "active", "cancelled"])))
+    db.flush()
+    return customer
+
+
+def orm_products(db: Session, limit: int) -> bytes:
+    rows = db.query(Product).filter(Product.status == "active").limit(limit).all()
+    adapter = TypeAdapter(List[ProductResponse])
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def fast_products(db: Session, limit: int) -> bytes:
+    return orjson.dumps(select_product_fields(db, list(PRODUCT_FIELDS), True, 0, limit))
+
+
+def orm_orders(db: Session, user_id) -> bytes:
+    orders = db.query(Order).options(
+        joinedload(Order.items).joinedload(OrderItem.product),
+        joinedload(Order.user)
+    ).filter(Order.user_id == user_id).order_by(Order.created_at.desc()).all()
+    for order in orders:
+        _, order.total_fulfilled, order.total_refundable = calculate_order_totals(order)
+    adapter = TypeAdapter(List[OrderResponse])
+    return adapter.dump_json(adapter.validate_python(orders, from_attributes=True))
+
+
+def fast_orders(db: Session, user_id) -> bytes:
+    return orjson.dumps(select_order_fields(db, list(ORDER_FIELDS), user_id))
+
+
+def measure(label: str, fn, rows: int, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        body = fn()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<12} {best * 1000:8.2f} ms CPU  {best / rows * 1e6:8.2f} us/row")
+    return body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--items", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = Session(bind=connection)
+    try:
+        customer = seed(db, args.products, args.orders, args.items)
+        cases = [
+            ("products", args.products,
+             lambda: orm_products(db, args.products), lambda: fast_products(db, args.products)),
+            ("orders", args.orders,
+             lambda: orm_orders(db, customer.id), lambda: fast_orders(db, customer.id)),
+        ]
+        for name, rows, orm_fn, fast_fn in cases:
+            print(f"{name} ({rows} rows)")
+
+            def orm_run():
+                db.expunge_all()
+                return orm_fn()
+
+            orm_body = measure("orm+pydantic", orm_run, rows, args.repeat)
+            fast_body = measure("core+orjson", fast_fn, rows, args.repeat)
+            print(f"  identical payloads: {orm_body == fast_body}")
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark: per-request cost of the hot queries, legacy Query vs pre-built statements
+For each hot query it compares three variants:
+  uncached  legacy db.query(...) with the compiled cache bypassed (compile every time)
+  legacy    legacy db.query(...) as the handlers used to run it (built + cache key each call)
+  prebuilt  the statements in app/services/statements.py
+Seeds a few rows inside a transaction that is rolled back afterwards.
+
+Usage (from backend/):
+    python -m benchmarks.statement_cache --iterations 2000
+"""
+import argparse
+import time
+import uuid
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+from app.database import engine, Base
+from app.models.user import User
+from app.models.product import Product
+from app.models.order import Order, OrderItem
+from app.services import statements
+from app.services.read_models import PRODUCT_FIELDS
+
+NO_COMPILED_CACHE = {"compiled_cache": None}
+
+
+def seed(db: Session):
+    customer = User(name="Bench Customer", phone=f"bench-{uuid.uuid4().hex[:8]}", role="customer")
+    products = [
+        Product(sku=f"BENCH-{uuid.uuid4().hex[:10]}", name=f"Bench Product {i}", price=10.0 + i, stock=100,
+                status="active", category="bench")
+        for i in range(20)
+    ]
+    db.add(customer)
+    db.add_all(products)
+    db.flush()
+    order = Order(user_id=customer.id, total=0.0, status="pending")
+    db.add(order)
+    db.flush()
+    db.add_all([OrderItem(order_id=order.id, product_id=product.id, quantity=1, price=product.price)
+                for product in products[:4]])
+    db.flush()
+    return customer.id, products[0].id, order.id
+
+
+def legacy_product_page(fields, active_only=True, skip=0, limit=20):
+    stmt = select(*[getattr(Product, name) for name in fields])
+    if active_only:
+        stmt = stmt.where(Product.status == "active")
+    return stmt.offset(skip).limit(limit)
+
+
+def build_cases(db: Session, user_id, product_id, order_id):
+    fields = tuple(PRODUCT_FIELDS)
+    legacy_order = lambda options: db.query(Order).options(
+        joinedload(Order.items).joinedload(OrderItem.product), joinedload(Order.user)
+    ).execution_options(**options).filter(Order.id == order_id).first()
+    return [
+        ("product FOR UPDATE", {
+            "uncached": lambda: db.query(Product).execution_options(**NO_COMPILED_CACHE)
+                .filter(Product.id == product_id).with_for_update().first(),
+            "legacy": lambda: db.query(Product).filter(Product.id == product_id).with_for_update().first(),
+            "prebuilt": lambda: statements.get_product_for_update(db, product_id),
+        }),
+        ("user by id", {
+            "uncached": lambda: db.query(User).execution_options(**NO_COMPILED_CACHE)
+                .filter(User.id == user_id).first(),
+            "legacy": lambda: db.query(User).filter(User.id == user_id).first(),
+            "prebuilt": lambda: statements.get_user(db, user_id),
+        }),
+        ("catalog page", {
+            "uncached": lambda: db.execute(legacy_product_page(fields), execution_options=NO_COMPILED_CACHE).all(),
+            "legacy": lambda: db.execute(legacy_product_page(fields)).all(),
+            "prebuilt": lambda: db.execute(statements.product_page_statement(fields, True),
+                                           {"skip": 0, "limit": 20}).all(),
+        }),
+        ("order with items", {
+            "uncached": lambda: legacy_order(NO_COMPILED_CACHE),
+            "legacy": lambda: legacy_order({}),
+            "prebuilt": lambda: statements.get_order_with_items(db, order_id),
+        }),
+    ]
+
+
+def measure(fn, iterations: int) -> float:
+    """CPU microseconds per call, best of three rounds."""
+    fn()
+    best = None
+    for _ in range(3):
+        start = time.process_time()
+        for _ in range(iterations):
+            fn()
+        elapsed = (time.process_time() - start) / iterations * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = Session(bind=connection)
+    try:
+        cases = build_cases(db, *seed(db))
+        statements.reset_statement_cache_stats()
+        total_saved = 0.0
+        print(f"{'query':<20} {'uncached':>10} {'legacy':>10} {'prebuilt':>10} {'saved/call':>11}   (us CPU per call)")
+        for name, variants in cases:
+            timings = {label: measure(fn, args.iterations) for label, fn in variants.items()}
+            saved = timings["legacy"] - timings["prebuilt"]
+            total_saved += saved
+            print(f"{name:<20} {timings['uncached']:>10.1f} {timings['legacy']:>10.1f} "
+                  f"{timings['prebuilt']:>10.1f} {saved:>11.1f}")
+        print(f"\nSaving for a request running each hot query once: {total_saved:.1f} us CPU")
+        print(f"Compiled cache during the run: {statements.statement_cache_stats()}")
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()